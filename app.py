@@ -1,13 +1,31 @@
 import os
 import sqlite3
-from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, make_response
+from datetime import datetime, timedelta
+from flask import Flask, Response, g, has_app_context, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory, stream_with_context
+import base64
+import click
+import colorsys
 import csv
+import hashlib
+import heapq
 import io
+import itertools
+import json
+import math
 import re
+import statistics
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from flask_session import Session
 from werkzeug.security import check_password_hash, generate_password_hash
-from werkzeug.utils import secure_filename
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Thumbnails are then shown as uploaded, without resized derivatives
+    Image = ImageOps = None
 
 app = Flask(__name__)
 
@@ -16,6 +34,29 @@ app.config['SESSION_TYPE'] = 'filesystem'
 app.config['UPLOAD_FOLDER'] = 'uploads/thumbnails'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['DATABASE'] = 'data/ig_data.db'
+app.config['DB_POOL_SIZE'] = 8  # idle SQLite connections kept for reuse
+app.config['SQLITE_CACHE_SIZE_KB'] = 16 * 1024
+app.config['SQLITE_MMAP_SIZE'] = 64 * 1024 * 1024
+app.config['DASHBOARD_CACHE_SIZE'] = 256  # cached dashboard results (LRU)
+app.config['ALERTS_CACHE_TTL'] = 300  # seconds; alerts depend on the current date
+app.config['HASHTAG_CACHE_SIZE'] = 128  # cached hashtag analytics results (LRU)
+app.config['JOB_WORKERS'] = 2  # background job threads
+app.config['JOB_RETENTION_DAYS'] = 7  # finished jobs are pruned after this
+app.config['JOB_CLAIM_BACKOFF'] = 0.5  # seconds a worker waits before retrying a failed claim (doubles, capped at 30)
+app.config['POSTS_PAGE_SIZE'] = 50  # rows per post listing page
+app.config['POSTS_PAGE_SIZE_MAX'] = 200
+app.config['PREDICTION_PRIOR_STRENGTH'] = 5  # pseudo-posts each feature level is shrunk toward the average with
+app.config['PREDICTION_BATCH_MAX'] = 5000  # candidates scored per batch prediction request
+app.config['ANOMALY_ALPHA'] = 0.1  # weight of each new post in its type's baseline
+app.config['ANOMALY_WARMUP'] = 5  # posts of a type needed before they are scored
+app.config['ANOMALY_CLIP'] = 3  # deviations are clipped at this many standard deviations when updating
+app.config['ANOMALY_Z_THRESHOLD'] = 2  # |z| that raises a performance alert
+app.config['THUMBNAIL_VARIANTS'] = {'list': (128, 128), 'report': (480, 480)}  # bounding box of each derivative
+app.config['THUMBNAIL_FORMAT'] = 'WEBP'
+app.config['THUMBNAIL_QUALITY'] = 80
+app.config['THUMBNAIL_PALETTE_SIZE'] = 5  # colours kept per thumbnail palette
+app.config['THUMBNAIL_GC_GRACE_SECONDS'] = 3600  # unreferenced files younger than this are kept
+app.config['THUMBNAIL_MAX_AGE'] = 365 * 86400  # seconds browsers may cache a served thumbnail
 
 Session(app)
 
@@ -24,17 +65,137 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def get_db_connection():
+_db_pool = {}
+_db_pool_lock = threading.Lock()
+DB_POOL_STATS = {'opened': 0, 'reused_in_request': 0, 'reused_from_pool': 0, 'returned': 0, 'closed': 0}
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection whose close() hands it back to the pool instead of closing it"""
+    def close(self):
+        if has_app_context() and g.get('_db') is self:
+            return  # Still bound to this request; released on teardown
+        _release_db_connection(self)
+    
+    def close_for_real(self):
+        sqlite3.Connection.close(self)
+
+def _count(stat):
+    with _db_pool_lock:
+        DB_POOL_STATS[stat] += 1
+
+def _open_db_connection(path):
     # Ensure data directory exists
     try:
-        os.makedirs('data', exist_ok=True)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
     except (OSError, PermissionError):
         pass  # Continue if we can't create directory
     
-    conn = sqlite3.connect(app.config['DATABASE'])
+    conn = sqlite3.connect(path, factory=PooledConnection, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.pool_path = path
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+    except sqlite3.OperationalError:
+        pass  # Read-only filesystems can't switch journal mode
+    conn.execute(f"PRAGMA cache_size=-{int(app.config['SQLITE_CACHE_SIZE_KB'])}")
+    conn.execute(f"PRAGMA mmap_size={int(app.config['SQLITE_MMAP_SIZE'])}")
+    conn.execute('PRAGMA temp_store=MEMORY')
+    _count('opened')
     return conn
 
+def _release_db_connection(conn):
+    """Return a connection to the pool, closing it if the pool is already full"""
+    if conn.in_transaction:
+        conn.rollback()
+    with _db_pool_lock:
+        idle = _db_pool.setdefault(conn.pool_path, [])
+        if len(idle) < app.config['DB_POOL_SIZE'] and conn not in idle:
+            idle.append(conn)
+            DB_POOL_STATS['returned'] += 1
+            return
+        if conn in idle:
+            return
+        DB_POOL_STATS['closed'] += 1
+    conn.close_for_real()
+
+def get_db_connection():
+    """Get the request's SQLite connection, reusing a pooled one when possible"""
+    if has_app_context() and g.get('_db') is not None:
+        _count('reused_in_request')
+        return g._db
+    
+    path = app.config['DATABASE']
+    with _db_pool_lock:
+        idle = _db_pool.get(path)
+        conn = idle.pop() if idle else None
+        if conn is not None:
+            DB_POOL_STATS['reused_from_pool'] += 1
+    if conn is None:
+        conn = _open_db_connection(path)
+    
+    if has_app_context():
+        g._db = conn
+    return conn
+
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    conn = g.pop('_db', None)
+    if conn is not None:
+        _release_db_connection(conn)
+
+class ResultCache:
+    """Thread-safe LRU cache with optional per-entry TTL and hit/miss counters"""
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+    
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, size=len(self._entries), maxsize=self.maxsize)
+
+dashboard_cache = ResultCache(app.config['DASHBOARD_CACHE_SIZE'])
+hashtag_cache = ResultCache(app.config['HASHTAG_CACHE_SIZE'])
+
+def bump_data_version(db, project_ids):
+    """Mark projects' posts as changed so cached results keyed on the old version go stale"""
+    project_ids = list(set(project_ids))
+    if project_ids:
+        db.execute(
+            f"UPDATE projects SET data_version = data_version + 1 WHERE id IN ({','.join('?' * len(project_ids))})",
+            project_ids
+        )
+
 def init_db():
     with app.app_context():
         db = get_db_connection()
@@ -136,8 +297,256 @@ def init_db():
         ''')
         
         db.commit()
+        run_migrations(db)
         db.close()
 
+# Ordered schema migrations applied on top of the base tables in init_db().
+# Append new (version, description, statements) entries; never edit applied ones.
+# Statements are SQL only. Data that current code derives from posts is requested with a
+# ('rebuild', name) step instead and rebuilt once every migration has run (see DATA_REBUILDS),
+# since that code may read columns later migrations add.
+MIGRATIONS = [
+    (1, 'Indexes for hot post, hashtag and comment lookups', [
+        'CREATE INDEX IF NOT EXISTS idx_projects_user ON projects(user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_date ON posts(project_id, post_date)',
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_type_category ON posts(project_id, post_type, caption_category)',
+        'CREATE INDEX IF NOT EXISTS idx_hashtags_post ON hashtags(post_id)',
+        'CREATE INDEX IF NOT EXISTS idx_hashtags_hashtag ON hashtags(hashtag)',
+        'CREATE INDEX IF NOT EXISTS idx_post_comments_post_created ON post_comments(post_id, created_at)',
+    ]),
+    (2, 'Materialized post hour, weekday, ISO week and month columns', [
+        'ALTER TABLE posts ADD COLUMN post_hour INTEGER',
+        'ALTER TABLE posts ADD COLUMN post_weekday INTEGER',
+        'ALTER TABLE posts ADD COLUMN post_week TEXT',
+        'ALTER TABLE posts ADD COLUMN post_month TEXT',
+        ('rebuild', 'post_time_fields'),
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_hour ON posts(project_id, post_hour)',
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_weekday ON posts(project_id, post_weekday)',
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_week ON posts(project_id, post_week)',
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_month ON posts(project_id, post_month)',
+    ]),
+    (3, 'Incrementally maintained per-project rollups', [
+        '''
+        CREATE TABLE IF NOT EXISTS post_rollups (
+            project_id INTEGER NOT NULL,
+            dimension TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            post_count INTEGER NOT NULL DEFAULT 0,
+            engagement_sum REAL NOT NULL DEFAULT 0,
+            weighted_engagement_sum REAL NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            reach_sum INTEGER NOT NULL DEFAULT 0,
+            followers_sum INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (project_id, dimension, bucket),
+            FOREIGN KEY (project_id) REFERENCES projects(id)
+        )
+        ''',
+        ('rebuild', 'rollups'),
+    ]),
+    (4, 'Per-project data version for cache invalidation', [
+        'ALTER TABLE projects ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0',
+    ]),
+    (5, 'Trend store bookkeeping columns', [
+        'ALTER TABLE trends ADD COLUMN avg_engagement REAL',
+        'ALTER TABLE trends ADD COLUMN post_count INTEGER NOT NULL DEFAULT 0',
+        'ALTER TABLE trends ADD COLUMN data_version INTEGER NOT NULL DEFAULT -1',
+        'ALTER TABLE trends ADD COLUMN updated_at TEXT',
+        'CREATE INDEX IF NOT EXISTS idx_trends_project_type_value ON trends(project_id, trend_type, trend_value)',
+        ('rebuild', 'trends'),
+    ]),
+    (6, 'Report snapshot payload columns', [
+        'ALTER TABLE reports ADD COLUMN payload BLOB',
+        'ALTER TABLE reports ADD COLUMN content_hash TEXT',
+        'ALTER TABLE reports ADD COLUMN post_count INTEGER',
+        'ALTER TABLE reports ADD COLUMN data_version INTEGER',
+        'CREATE INDEX IF NOT EXISTS idx_reports_project ON reports(project_id, id)',
+    ]),
+    (7, 'Background job queue', [
+        '''CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            project_id INTEGER NOT NULL,
+            job_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            result BLOB,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (project_id) REFERENCES projects(id)
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)',
+        'CREATE INDEX IF NOT EXISTS idx_jobs_project ON jobs(project_id, job_type, status)',
+    ]),
+    (8, 'Indexes for keyset-paginated post listings', [
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_engagement ON posts(project_id, engagement_rate)',
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_score ON posts(project_id, performance_score)',
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_reach ON posts(project_id, reach)',
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_likes ON posts(project_id, likes)',
+    ]),
+    (9, 'Normalized hashtag dictionary and post links', [
+        '''CREATE TABLE IF NOT EXISTS hashtag (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tag TEXT UNIQUE NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS post_hashtags (
+            post_id INTEGER NOT NULL,
+            hashtag_id INTEGER NOT NULL,
+            PRIMARY KEY (post_id, hashtag_id),
+            FOREIGN KEY (post_id) REFERENCES posts(id),
+            FOREIGN KEY (hashtag_id) REFERENCES hashtag(id)
+        ) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_post_hashtags_hashtag ON post_hashtags(hashtag_id, post_id)',
+        ('rebuild', 'post_hashtags'),
+        # Captions stay the source of truth; the free-text table is no longer written
+        'DELETE FROM hashtags',
+    ]),
+    (10, 'Stored caption features', [
+        'ALTER TABLE posts ADD COLUMN caption_hashtags TEXT',
+        'ALTER TABLE posts ADD COLUMN caption_mentions INTEGER',
+        'ALTER TABLE posts ADD COLUMN caption_emojis INTEGER',
+        'ALTER TABLE posts ADD COLUMN caption_words INTEGER',
+        'ALTER TABLE posts ADD COLUMN caption_length_bucket TEXT',
+        'ALTER TABLE posts ADD COLUMN caption_lines INTEGER',
+        'ALTER TABLE posts ADD COLUMN caption_cta INTEGER',
+        ('rebuild', 'caption_features'),
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_caption_length ON posts(project_id, caption_length_bucket)',
+    ]),
+    (11, 'Fitted prediction models', [
+        '''CREATE TABLE IF NOT EXISTS prediction_models (
+            project_id INTEGER PRIMARY KEY,
+            data_version INTEGER NOT NULL,
+            model BLOB NOT NULL,
+            fitted_at TEXT NOT NULL,
+            FOREIGN KEY (project_id) REFERENCES projects(id)
+        )''',
+    ]),
+    (12, 'Anomaly baselines and per-post z-scores', [
+        '''CREATE TABLE IF NOT EXISTS anomaly_baselines (
+            project_id INTEGER NOT NULL,
+            post_type TEXT NOT NULL,
+            post_count INTEGER NOT NULL,
+            score_mean REAL NOT NULL,
+            score_var REAL NOT NULL,
+            engagement_mean REAL NOT NULL,
+            engagement_var REAL NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (project_id, post_type),
+            FOREIGN KEY (project_id) REFERENCES projects(id)
+        )''',
+        'ALTER TABLE posts ADD COLUMN anomaly_score_z REAL',
+        'ALTER TABLE posts ADD COLUMN anomaly_engagement_z REAL',
+        'ALTER TABLE posts ADD COLUMN anomaly_score_baseline REAL',
+        ('rebuild', 'anomaly_baselines'),
+    ]),
+    (13, 'Daily rollups for time series', [
+        ('rebuild', 'rollups'),
+    ]),
+    (14, 'Resized thumbnail derivatives', [
+        'ALTER TABLE posts ADD COLUMN thumbnail_status TEXT',
+        'ALTER TABLE posts ADD COLUMN thumbnail_width INTEGER',
+        'ALTER TABLE posts ADD COLUMN thumbnail_height INTEGER',
+        '''CREATE TABLE IF NOT EXISTS post_thumbnails (
+            post_id INTEGER NOT NULL,
+            variant TEXT NOT NULL,
+            path TEXT NOT NULL,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL,
+            bytes INTEGER NOT NULL,
+            PRIMARY KEY (post_id, variant),
+            FOREIGN KEY (post_id) REFERENCES posts(id)
+        ) WITHOUT ROWID''',
+        # Existing uploads are resized by the job workers once the app starts
+        "UPDATE posts SET thumbnail_status = 'pending' WHERE COALESCE(thumbnail_path, '') != ''",
+        '''INSERT INTO jobs (user_id, project_id, job_type, status, created_at)
+        SELECT pr.user_id, pr.id, 'thumbnails', 'queued', strftime('%Y-%m-%dT%H:%M:%S', 'now') FROM projects pr
+        WHERE EXISTS (SELECT 1 FROM posts p WHERE p.project_id = pr.id AND p.thumbnail_status = 'pending')''',
+    ]),
+    (15, 'Thumbnail palettes and colour styles', [
+        'ALTER TABLE posts ADD COLUMN thumbnail_palette TEXT',
+        'ALTER TABLE posts ADD COLUMN thumbnail_dominant_hex TEXT',
+        # Covers the colour-style group-by, so it is answered from the index alone
+        'CREATE INDEX IF NOT EXISTS idx_posts_project_color ON posts(project_id, dominant_color, performance_score, engagement_rate_weighted)',
+        # Thumbnails that were already resized get their colours measured by the job workers
+        '''INSERT INTO jobs (user_id, project_id, job_type, status, created_at)
+        SELECT pr.user_id, pr.id, 'thumbnails', 'queued', strftime('%Y-%m-%dT%H:%M:%S', 'now') FROM projects pr
+        WHERE EXISTS (SELECT 1 FROM posts p WHERE p.project_id = pr.id AND p.thumbnail_status = 'ready')
+        AND NOT EXISTS (
+            SELECT 1 FROM jobs j WHERE j.project_id = pr.id AND j.job_type = 'thumbnails' AND j.status = 'queued'
+        )''',
+    ]),
+    (16, 'Content-addressed thumbnail references', [
+        # Files are shared between posts, so deletes count the remaining references by path
+        'CREATE INDEX IF NOT EXISTS idx_posts_thumbnail_path ON posts(thumbnail_path)',
+        'CREATE INDEX IF NOT EXISTS idx_post_thumbnails_path ON post_thumbnails(path)',
+    ]),
+    (17, 'Drop trend types the prediction model replaced', [
+        ('rebuild', 'trends'),
+    ]),
+]
+
+# Derived data rebuilt after migrations, in dependency order: rollups read the time fields, and
+# trends read the time fields and caption features
+DATA_REBUILDS = [
+    ('post_time_fields', lambda db: backfill_post_time_fields(db)),
+    ('caption_features', lambda db: backfill_caption_features(db)),
+    ('post_hashtags', lambda db: backfill_post_hashtags(db)),
+    ('rollups', lambda db: rebuild_rollups(db)),
+    ('anomaly_baselines', lambda db: rebuild_anomaly_baselines(db)),
+    ('trends', lambda db: [materialize_trends(db, row['id']) for row in db.execute('SELECT id FROM projects').fetchall()]),
+]
+
+def run_migrations(db):
+    """Apply any pending MIGRATIONS in order, one transaction per version, then the rebuilds they requested"""
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    ''')
+    # Requested rebuilds are recorded with their migration, so a failed rebuild is retried on the next start
+    db.execute('CREATE TABLE IF NOT EXISTS pending_rebuilds (name TEXT PRIMARY KEY)')
+    db.commit()
+    
+    current = db.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            for statement in statements:
+                if isinstance(statement, tuple):
+                    db.execute('INSERT OR IGNORE INTO pending_rebuilds (name) VALUES (?)', (statement[1],))
+                else:
+                    db.execute(statement)
+            db.execute(
+                'INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)',
+                (version, description, datetime.now().isoformat())
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        applied.append(version)
+    
+    pending = {row[0] for row in db.execute('SELECT name FROM pending_rebuilds')}
+    if pending:
+        try:
+            for name, rebuild in DATA_REBUILDS:
+                if name in pending:
+                    rebuild(db)
+            db.execute('DELETE FROM pending_rebuilds')
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    
+    if applied:
+        db.execute('PRAGMA optimize')
+    return applied
+
 def calculate_metrics(likes, comments, shares, saves, reach, avg_view_duration, reel_length, followers_gained):
     # Engagement Rate (Unweighted)
     engagement_rate = ((likes + comments + shares + saves) / reach) * 100 if reach > 0 else 0
@@ -145,8 +554,8 @@ def calculate_metrics(likes, comments, shares, saves, reach, avg_view_duration,
     # Engagement Rate (Weighted)
     engagement_rate_weighted = ((likes + comments + (shares * 2) + (saves * 2)) / reach) * 100 if reach > 0 else 0
     
-    # Average View Duration Ratio
-    avd_ratio = (avg_view_duration / reel_length) * 100 if reel_length > 0 else 0
+    # Average View Duration Ratio (only reels have a length and view duration)
+    avd_ratio = ((avg_view_duration or 0) / reel_length) * 100 if reel_length and reel_length > 0 else 0
     
     # Follower Gain Rate
     follower_gain_rate = (followers_gained / reach) * 100 if reach > 0 else 0
@@ -162,91 +571,1134 @@ def calculate_metrics(likes, comments, shares, saves, reach, avg_view_duration,
         'performance_score': round(performance_score, 2)
     }
 
+def calculate_metrics_batch(likes, comments, shares, saves, reach, avg_view_duration, reel_length, followers_gained):
+    """Calculate derived metrics for whole columns of posts in one pass.
+
+    Takes equal-length sequences (one per calculate_metrics argument) and returns
+    a dict of lists keyed like calculate_metrics, with identical rounding and
+    zero-division handling for every post.
+    """
+    engagement_rates = []
+    weighted_rates = []
+    avd_ratios = []
+    follower_gain_rates = []
+    performance_scores = []
+    
+    for l, c, sh, sv, r, avd, rl, fg in zip(likes, comments, shares, saves, reach, avg_view_duration, reel_length, followers_gained):
+        if r > 0:
+            engagement_rate = ((l + c + sh + sv) / r) * 100
+            engagement_rate_weighted = ((l + c + (sh * 2) + (sv * 2)) / r) * 100
+            follower_gain_rate = (fg / r) * 100
+        else:
+            engagement_rate = engagement_rate_weighted = follower_gain_rate = 0
+        avd_ratio = ((avd or 0) / rl) * 100 if rl and rl > 0 else 0
+        
+        engagement_rates.append(round(engagement_rate, 2))
+        weighted_rates.append(round(engagement_rate_weighted, 2))
+        avd_ratios.append(round(avd_ratio, 2))
+        follower_gain_rates.append(round(follower_gain_rate, 2))
+        performance_scores.append(round((engagement_rate_weighted * 0.5) + (avd_ratio * 0.3) + (follower_gain_rate * 0.2), 2))
+    
+    return {
+        'engagement_rate': engagement_rates,
+        'engagement_rate_weighted': weighted_rates,
+        'avd_ratio': avd_ratios,
+        'follower_gain_rate': follower_gain_rates,
+        'performance_score': performance_scores
+    }
+
+def derive_post_time_fields(post_date, post_time):
+    """Split a post's date/time into the stored hour, weekday (Mon=0), ISO week and month"""
+    hour_part = (post_time or '').split(':', 1)[0]
+    hour = int(hour_part) if hour_part.isdigit() else None
+    try:
+        day = datetime.strptime(post_date or '', '%Y-%m-%d')
+    except ValueError:
+        return hour, None, None, None
+    iso_year, iso_week, _ = day.isocalendar()
+    return hour, day.weekday(), f'{iso_year}-W{iso_week:02d}', post_date[:7]
+
+def backfill_post_time_fields(db):
+    """Populate post_hour/post_weekday/post_week/post_month for existing rows"""
+    rows = db.execute('SELECT id, post_date, post_time FROM posts WHERE post_hour IS NULL').fetchall()
+    db.executemany(
+        'UPDATE posts SET post_hour = ?, post_weekday = ?, post_week = ?, post_month = ? WHERE id = ?',
+        [(*derive_post_time_fields(row['post_date'], row['post_time']), row['id']) for row in rows]
+    )
+
+# Caption features are extracted once per post with these precompiled patterns and stored as columns
+HASHTAG_PATTERN = re.compile(r'#(\w+)')
+MENTION_PATTERN = re.compile(r'@(\w+)')
+EMOJI_PATTERN = re.compile('[\U0001F1E6-\U0001F1FF\U0001F300-\U0001FAFF\u2600-\u27BF\u2B50\u2B55]')
+CTA_PATTERN = re.compile(
+    r'\b(link in bio|comment below|tag a friend|tag someone|save this|share this|double tap|'
+    r'swipe|dm me|dm us|shop now|sign up|click the link|let me know|follow for more)\b',
+    re.IGNORECASE
+)
+CAPTION_FEATURE_COLUMNS = [
+    'caption_hashtags', 'caption_mentions', 'caption_emojis', 'caption_words',
+    'caption_length_bucket', 'caption_lines', 'caption_cta'
+]
+
+def caption_length_bucket(length):
+    """Short/Medium/Long bucket used by caption length recommendations"""
+    if length < 50:
+        return 'Short'
+    if length < 150:
+        return 'Medium'
+    return 'Long'
+
+def extract_caption_features(caption):
+    """Stored caption features, keyed in CAPTION_FEATURE_COLUMNS order"""
+    if caption is None:
+        return dict.fromkeys(CAPTION_FEATURE_COLUMNS)
+    return {
+        'caption_hashtags': ' '.join(sorted(set(HASHTAG_PATTERN.findall(caption.lower())))),
+        'caption_mentions': len(MENTION_PATTERN.findall(caption)),
+        'caption_emojis': len(EMOJI_PATTERN.findall(caption)),
+        'caption_words': len(caption.split()),
+        'caption_length_bucket': caption_length_bucket(len(caption)),
+        'caption_lines': caption.count('\n'),
+        'caption_cta': 1 if CTA_PATTERN.search(caption) else 0
+    }
+
+def backfill_caption_features(db, batch_size=1000):
+    """Populate the caption feature columns for existing rows"""
+    assignments = ', '.join(f'{column} = ?' for column in CAPTION_FEATURE_COLUMNS)
+    rows = db.execute('SELECT id, caption FROM posts').fetchall()
+    for start in range(0, len(rows), batch_size):
+        db.executemany(f'UPDATE posts SET {assignments} WHERE id = ?', [
+            (*extract_caption_features(row['caption']).values(), row['id'])
+            for row in rows[start:start + batch_size]
+        ])
+
+# Columns written for every new post; derived fields are filled by post_insert_values()
+POST_INSERT_COLUMNS = [
+    'project_id', 'post_type', 'post_date', 'post_time', 'reel_length',
+    'thumbnail_path', 'caption', 'caption_category', 'likes', 'shares',
+    'comments', 'reach', 'saves', 'followers_gained', 'watch_time',
+    'avg_view_duration', 'engagement_rate', 'engagement_rate_weighted',
+    'avd_ratio', 'follower_gain_rate', 'performance_score', 'dominant_color',
+    'post_hour', 'post_weekday', 'post_week', 'post_month'
+] + CAPTION_FEATURE_COLUMNS + ['anomaly_score_z', 'anomaly_engagement_z', 'anomaly_score_baseline', 'thumbnail_status']
+POST_INSERT_SQL = f'''
+    INSERT INTO posts ({', '.join(POST_INSERT_COLUMNS)})
+    VALUES ({', '.join('?' * len(POST_INSERT_COLUMNS))})
+'''
+
+def post_insert_values(post):
+    """Build the POST_INSERT_SQL parameters for a post dict, adding derived columns"""
+    post = dict(post)
+    post['post_hour'], post['post_weekday'], post['post_week'], post['post_month'] = \
+        derive_post_time_fields(post['post_date'], post['post_time'])
+    post.update(extract_caption_features(post.get('caption')))
+    return tuple(post.get(column) for column in POST_INSERT_COLUMNS)
+
 def extract_hashtags(text):
     """Extract hashtags from caption text"""
     if not text:
         return []
-    # Find all hashtags (# followed by word characters)
-    hashtags = re.findall(r'#\w+', text.lower())
-    # Remove duplicates and return clean hashtags
-    return list(set([tag[1:] for tag in hashtags]))  # Remove the # symbol
+    # Find all hashtags (# followed by word characters), without duplicates or the # symbol
+    return list(set(HASHTAG_PATTERN.findall(text.lower())))
+
+def save_post_hashtags(db, posts):
+    """Link (post_id, caption) pairs to the hashtag dictionary with one executemany per table"""
+    links = [(post_id, hashtag) for post_id, caption in posts for hashtag in extract_hashtags(caption)]
+    if not links:
+        return
+    db.executemany('INSERT OR IGNORE INTO hashtag (tag) VALUES (?)', [(tag,) for tag in {tag for _, tag in links}])
+    db.executemany(
+        'INSERT OR IGNORE INTO post_hashtags (post_id, hashtag_id) SELECT ?, id FROM hashtag WHERE tag = ?',
+        links
+    )
 
 def save_hashtags(post_id, caption, db):
     """Extract and save hashtags from post caption"""
-    hashtags = extract_hashtags(caption)
-    for hashtag in hashtags:
-        db.execute(
-            'INSERT INTO hashtags (post_id, hashtag) VALUES (?, ?)',
-            (post_id, hashtag)
+    save_post_hashtags(db, [(post_id, caption)])
+
+def backfill_post_hashtags(db, batch_size=1000):
+    """Rebuild post_hashtags from every post's caption"""
+    db.execute('DELETE FROM post_hashtags')
+    cursor = db.execute('SELECT id, caption FROM posts')
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        save_post_hashtags(db, [(row['id'], row['caption']) for row in batch])
+
+def posts_with_hashtag(db, project_ids_str, tag):
+    """Ids of the given projects' posts tagged with #tag, via the post_hashtags index"""
+    return [row[0] for row in db.execute(f'''
+        SELECT ph.post_id FROM hashtag h
+        JOIN post_hashtags ph ON ph.hashtag_id = h.id
+        JOIN posts p ON p.id = ph.post_id
+        WHERE h.tag = ? AND p.project_id IN ({project_ids_str})
+        ORDER BY ph.post_id
+    ''', (tag.lstrip('#').lower(),))]
+
+def top_hashtags(db, project_ids_str, limit=20, min_posts=1):
+    """Hashtags ranked by average performance_score across the given projects"""
+    return db.execute(f'''
+        SELECT h.tag as hashtag, COUNT(*) as post_count,
+            AVG(p.performance_score) as avg_score,
+            AVG(p.engagement_rate_weighted) as avg_engagement
+        FROM post_hashtags ph
+        JOIN hashtag h ON h.id = ph.hashtag_id
+        JOIN posts p ON p.id = ph.post_id
+        WHERE p.project_id IN ({project_ids_str})
+        GROUP BY ph.hashtag_id
+        HAVING COUNT(*) >= ?
+        ORDER BY avg_score DESC, post_count DESC
+        LIMIT ?
+    ''', (min_posts, limit)).fetchall()
+
+def hashtag_analytics(db, project_ids_str, start_date=None, end_date=None, min_posts=1, limit=50, pair_limit=20):
+    """Per-hashtag performance, lift over the baseline and co-occurring pairs in one pass over tagged posts"""
+    conditions, params = [f'p.project_id IN ({project_ids_str})'], []
+    if start_date:
+        conditions.append('p.post_date >= ?')
+        params.append(start_date)
+    if end_date:
+        conditions.append('p.post_date <= ?')
+        params.append(end_date)
+    
+    # Untagged posts come through once with a NULL tag so they still count toward the baseline
+    rows = db.execute(f'''
+        SELECT p.id, p.performance_score, p.engagement_rate_weighted, h.tag
+        FROM posts p
+        LEFT JOIN post_hashtags ph ON ph.post_id = p.id
+        LEFT JOIN hashtag h ON h.id = ph.hashtag_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY p.id
+    ''', params)
+    
+    tags = {}
+    pairs = {}
+    total_posts = 0
+    total_score = 0.0
+    total_engagement = 0.0
+    
+    def close_post(post_tags, score):
+        for pair in itertools.combinations(sorted(post_tags), 2):
+            acc = pairs.get(pair)
+            if acc is None:
+                acc = pairs[pair] = [0, 0.0]
+            acc[0] += 1
+            acc[1] += score
+    
+    current_id, current_tags, current_score = None, [], 0
+    for post_id, score, engagement, tag in rows:
+        score, engagement = score or 0, engagement or 0
+        if post_id != current_id:
+            close_post(current_tags, current_score)
+            current_id, current_tags, current_score = post_id, [], score
+            total_posts += 1
+            total_score += score
+            total_engagement += engagement
+        if tag is None:
+            continue
+        current_tags.append(tag)
+        acc = tags.get(tag)
+        if acc is None:
+            acc = tags[tag] = ([], [])
+        acc[0].append(score)
+        acc[1].append(engagement)
+    close_post(current_tags, current_score)
+    
+    if not total_posts:
+        return {'baseline': None, 'hashtags': [], 'pairs': []}
+    
+    baseline_score = total_score / total_posts
+    baseline_engagement = total_engagement / total_posts
+    
+    def lift(value, baseline):
+        return round(value / baseline, 3) if baseline else None
+    
+    hashtags = []
+    for tag, (scores, engagements) in tags.items():
+        if len(scores) < min_posts:
+            continue
+        mean_score = sum(scores) / len(scores)
+        mean_engagement = sum(engagements) / len(engagements)
+        hashtags.append({
+            'hashtag': tag,
+            'count': len(scores),
+            'mean_score': round(mean_score, 2),
+            'median_score': round(statistics.median(scores), 2),
+            'mean_engagement': round(mean_engagement, 2),
+            'median_engagement': round(statistics.median(engagements), 2),
+            'score_lift': lift(mean_score, baseline_score),
+            'engagement_lift': lift(mean_engagement, baseline_engagement)
+        })
+    hashtags.sort(key=lambda item: (item['mean_score'], item['count']), reverse=True)
+    
+    # Pair lift compares how often two tags appear together with what independent use would predict
+    top_pairs = sorted(
+        (pair for pair in pairs.items() if pair[1][0] >= min_posts),
+        key=lambda pair: (pair[1][0], pair[1][1]), reverse=True
+    )[:pair_limit]
+    return {
+        'baseline': {
+            'posts': total_posts,
+            'mean_score': round(baseline_score, 2),
+            'mean_engagement': round(baseline_engagement, 2)
+        },
+        'hashtags': hashtags[:limit],
+        'pairs': [{
+            'hashtags': list(pair),
+            'count': count,
+            'mean_score': round(score_sum / count, 2),
+            'lift': round(count * total_posts / (len(tags[pair[0]][0]) * len(tags[pair[1]][0])), 3)
+        } for pair, (count, score_sum) in top_pairs]
+    }
+
+# Rollup dimensions: name -> SQL expression over posts used as the bucket.
+# 'total' has a single '' bucket holding the whole project's sums.
+ROLLUP_DIMENSIONS = {
+    'total': "''",
+    'month': "COALESCE(post_month, '')",
+    'post_type': "COALESCE(post_type, '')",
+    'caption_category': "COALESCE(caption_category, '')",
+    'hour': "COALESCE(CAST(post_hour AS TEXT), '')",
+    'day': "COALESCE(post_date, '')",
+}
+ROLLUP_COLUMNS = 'project_id, post_type, post_date, post_time, caption_category, engagement_rate, engagement_rate_weighted, performance_score, reach, followers_gained'
+ROLLUP_SUMS = [
+    ('engagement_sum', 'engagement_rate'),
+    ('weighted_engagement_sum', 'engagement_rate_weighted'),
+    ('score_sum', 'performance_score'),
+    ('reach_sum', 'reach'),
+    ('followers_sum', 'followers_gained'),
+]
+
+def _rollup_buckets(post):
+    hour, _, _, month = derive_post_time_fields(post['post_date'], post['post_time'])
+    return [
+        ('total', ''),
+        ('month', month or ''),
+        ('post_type', post['post_type'] or ''),
+        ('caption_category', post['caption_category'] or ''),
+        ('hour', '' if hour is None else str(hour)),
+        ('day', post['post_date'] or ''),
+    ]
+
+def apply_post_rollups(db, posts, sign=1):
+    """Add (sign=1) or remove (sign=-1) posts from the rollups in the caller's transaction"""
+    deltas = {}
+    for post in posts:
+        values = [sign * (post[column] or 0) for _, column in ROLLUP_SUMS]
+        for dimension, bucket in _rollup_buckets(post):
+            key = (post['project_id'], dimension, bucket)
+            delta = deltas.get(key)
+            if delta is None:
+                deltas[key] = [sign] + values
+            else:
+                delta[0] += sign
+                for i, value in enumerate(values, start=1):
+                    delta[i] += value
+    if not deltas:
+        return
+    
+    sum_columns = [name for name, _ in ROLLUP_SUMS]
+    db.executemany(f'''
+        INSERT INTO post_rollups (project_id, dimension, bucket, post_count, {', '.join(sum_columns)})
+        VALUES (?, ?, ?, ?, {', '.join('?' * len(sum_columns))})
+        ON CONFLICT (project_id, dimension, bucket) DO UPDATE SET
+            post_count = post_count + excluded.post_count,
+            {', '.join(f'{name} = {name} + excluded.{name}' for name in sum_columns)}
+    ''', [key + tuple(delta) for key, delta in deltas.items()])
+    if sign < 0:
+        db.execute('DELETE FROM post_rollups WHERE post_count <= 0')
+
+def remove_posts_from_rollups(db, post_ids):
+    """Subtract the given posts from the rollups before they are deleted"""
+    if not post_ids:
+        return
+    placeholders = ','.join('?' * len(post_ids))
+    rows = db.execute(f'SELECT {ROLLUP_COLUMNS} FROM posts WHERE id IN ({placeholders})', list(post_ids)).fetchall()
+    apply_post_rollups(db, rows, sign=-1)
+
+def _rollup_select(where=''):
+    sums = ', '.join(f'SUM(COALESCE({column}, 0))' for _, column in ROLLUP_SUMS)
+    return ' UNION ALL '.join(
+        f"SELECT project_id, '{dimension}', {expression}, COUNT(*), {sums} FROM posts {where} GROUP BY project_id, 3"
+        for dimension, expression in ROLLUP_DIMENSIONS.items()
+    )
+
+def rebuild_rollups(db, project_id=None):
+    """Recompute rollups from raw posts (all projects, or one)"""
+    where, params = ('WHERE project_id = ?', (project_id,)) if project_id is not None else ('', ())
+    db.execute(f'DELETE FROM post_rollups {where}', params)
+    db.execute(f'''
+        INSERT INTO post_rollups (project_id, dimension, bucket, post_count, {', '.join(name for name, _ in ROLLUP_SUMS)})
+        {_rollup_select(where)}
+    ''', params * len(ROLLUP_DIMENSIONS))
+
+def check_rollups(db, tolerance=1e-6):
+    """Compare stored rollups with a fresh aggregation; returns a list of mismatches"""
+    stored = {
+        (row[0], row[1], row[2]): tuple(row[3:])
+        for row in db.execute(f"SELECT project_id, dimension, bucket, post_count, {', '.join(name for name, _ in ROLLUP_SUMS)} FROM post_rollups")
+    }
+    expected = {(row[0], row[1], row[2]): tuple(row[3:]) for row in db.execute(_rollup_select())}
+    
+    mismatches = []
+    for key in sorted(set(stored) | set(expected), key=str):
+        have, want = stored.get(key), expected.get(key)
+        if have is None or want is None or any(abs(a - b) > tolerance for a, b in zip(have, want)):
+            mismatches.append({'key': key, 'stored': have, 'expected': want})
+    return mismatches
+
+def read_rollups(db, project_ids_str, dimension, start_bucket=None, end_bucket=None):
+    """Return {bucket: summed rollup row} for a dimension across the given projects, optionally within a bucket range"""
+    sums = ', '.join(f'SUM({name}) as {name}' for name, _ in ROLLUP_SUMS)
+    conditions, params = ['dimension = ?'], [dimension]
+    if start_bucket:
+        conditions.append('bucket >= ?')
+        params.append(start_bucket)
+    if end_bucket:
+        conditions.append('bucket <= ?')
+        params.append(end_bucket)
+    return {
+        row['bucket']: row
+        for row in db.execute(f'''
+            SELECT bucket, SUM(post_count) as post_count, {sums}
+            FROM post_rollups
+            WHERE project_id IN ({project_ids_str}) AND {' AND '.join(conditions)}
+            GROUP BY bucket
+        ''', params)
+    }
+
+# Anomaly baselines: per project and post type, an exponentially weighted mean and variance of each
+# metric. A post is scored against the baseline as it stood before the post, then folded in, so both
+# steps are O(1). Deviations are clipped at ANOMALY_CLIP standard deviations before the update, so a
+# single viral post barely moves the baseline.
+ANOMALY_METRICS = [('score', 'performance_score'), ('engagement', 'engagement_rate_weighted')]
+ANOMALY_COLUMNS = ['anomaly_score_z', 'anomaly_engagement_z', 'anomaly_score_baseline']
+
+def _new_anomaly_baseline(project_id, post_type):
+    return {
+        'project_id': project_id, 'post_type': post_type, 'post_count': 0,
+        'score_mean': 0.0, 'score_var': 0.0, 'engagement_mean': 0.0, 'engagement_var': 0.0
+    }
+
+def _score_post_anomaly(baseline, post):
+    """Set a post's anomaly columns from the baseline, then update the baseline with the post"""
+    count = baseline['post_count']
+    ready = count >= app.config['ANOMALY_WARMUP']
+    # Early posts get a plain running mean and variance; after that each post has weight ANOMALY_ALPHA
+    weight = max(app.config['ANOMALY_ALPHA'], 1 / (count + 1))
+    post['anomaly_score_baseline'] = baseline['score_mean'] if count else None
+    for name, column in ANOMALY_METRICS:
+        mean, var = baseline[f'{name}_mean'], baseline[f'{name}_var']
+        std = math.sqrt(var)
+        diff = (post[column] or 0) - mean
+        post[f'anomaly_{name}_z'] = round(diff / std, 3) if ready and std > 0 else None
+        if ready and std > 0:
+            limit = app.config['ANOMALY_CLIP'] * std
+            diff = max(-limit, min(limit, diff))
+        increment = weight * diff
+        baseline[f'{name}_mean'] = mean + increment
+        baseline[f'{name}_var'] = (1 - weight) * (var + diff * increment)
+    baseline['post_count'] = count + 1
+
+def _save_anomaly_baselines(db, baselines):
+    updated_at = datetime.now().isoformat()
+    db.executemany('''
+        INSERT OR REPLACE INTO anomaly_baselines
+            (project_id, post_type, post_count, score_mean, score_var, engagement_mean, engagement_var, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(
+        b['project_id'], b['post_type'], b['post_count'], b['score_mean'], b['score_var'],
+        b['engagement_mean'], b['engagement_var'], updated_at
+    ) for b in baselines])
+
+def apply_post_baselines(db, posts):
+    """Score new post dicts against their baselines and fold them in (the caller inserts the posts and commits)"""
+    keys = sorted({(post['project_id'], post['post_type'] or '') for post in posts})
+    if not keys:
+        return
+    # Seeding the rows first takes the write lock, so concurrent writers never update from the same state
+    db.executemany('''
+        INSERT OR IGNORE INTO anomaly_baselines
+            (project_id, post_type, post_count, score_mean, score_var, engagement_mean, engagement_var, updated_at)
+        VALUES (?, ?, 0, 0, 0, 0, 0, ?)
+    ''', [key + (datetime.now().isoformat(),) for key in keys])
+    baselines = {
+        key: dict(db.execute(
+            'SELECT * FROM anomaly_baselines WHERE project_id = ? AND post_type = ?', key
+        ).fetchone())
+        for key in keys
+    }
+    for post in posts:
+        _score_post_anomaly(baselines[(post['project_id'], post['post_type'] or '')], post)
+    _save_anomaly_baselines(db, baselines.values())
+
+def invalidate_anomaly_baselines(db, post_ids):
+    """Drop the baselines that include posts about to be deleted; the refresh worker replays them"""
+    if not post_ids:
+        return
+    placeholders = ','.join('?' * len(post_ids))
+    db.execute(f'''
+        DELETE FROM anomaly_baselines
+        WHERE (project_id, post_type) IN (
+            SELECT DISTINCT project_id, COALESCE(post_type, '') FROM posts WHERE id IN ({placeholders})
         )
+    ''', list(post_ids))
 
-def predict_post_performance(post_type, post_hour, caption_category, project_ids_str, db):
-    """Predict post performance based on historical data"""
-    # Get average performance for similar posts
-    similar_posts = db.execute(f'''
-        SELECT 
-            AVG(performance_score) as avg_score,
-            AVG(engagement_rate_weighted) as avg_engagement,
-            COUNT(*) as similar_count
-        FROM posts 
-        WHERE project_id IN ({project_ids_str})
-        AND post_type = ?
-        AND CAST(substr(post_time, 1, 2) AS INTEGER) = ?
-        AND caption_category = ?
-    ''', (post_type, post_hour, caption_category)).fetchone()
+def anomaly_baselines_stale(db, project_id):
+    """True when a project's baselines no longer cover exactly its posts (counted by the rollups)"""
+    return db.execute('''
+        SELECT 1 FROM post_rollups r
+        LEFT JOIN anomaly_baselines b ON b.project_id = r.project_id AND b.post_type = r.bucket
+        WHERE r.project_id = ? AND r.dimension = 'post_type' AND COALESCE(b.post_count, 0) != r.post_count
+        UNION ALL
+        SELECT 1 FROM anomaly_baselines b
+        WHERE b.project_id = ? AND NOT EXISTS (
+            SELECT 1 FROM post_rollups r
+            WHERE r.project_id = b.project_id AND r.dimension = 'post_type' AND r.bucket = b.post_type
+        )
+        LIMIT 1
+    ''', (project_id, project_id)).fetchone() is not None
+
+def rebuild_anomaly_baselines(db, project_id=None):
+    """Replay posts in posting order to rebuild baselines and stored z-scores (all projects, or one)"""
+    where, params = ('WHERE project_id = ?', (project_id,)) if project_id is not None else ('', ())
+    db.execute(f'DELETE FROM anomaly_baselines {where}', params)
+    rows = db.execute(f'''
+        SELECT id, project_id, post_type, performance_score, engagement_rate_weighted
+        FROM posts {where}
+        ORDER BY project_id, post_date, post_time, id
+    ''', params)
     
-    # Get overall averages as baseline
-    baseline = db.execute(f'''
-        SELECT 
-            AVG(performance_score) as avg_score,
-            AVG(engagement_rate_weighted) as avg_engagement
-        FROM posts 
-        WHERE project_id IN ({project_ids_str})
-    ''').fetchone()
+    baselines = {}
+    updates = []
+    for row in rows:
+        post = dict(row)
+        key = (post['project_id'], post['post_type'] or '')
+        baseline = baselines.get(key)
+        if baseline is None:
+            baseline = baselines[key] = _new_anomaly_baseline(*key)
+        _score_post_anomaly(baseline, post)
+        updates.append(tuple(post[column] for column in ANOMALY_COLUMNS) + (post['id'],))
+    db.executemany(
+        f"UPDATE posts SET {', '.join(f'{column} = ?' for column in ANOMALY_COLUMNS)} WHERE id = ?",
+        updates
+    )
+    _save_anomaly_baselines(db, baselines.values())
+
+# Trend store: trend_type -> (value expression, extra WHERE condition) over a project's posts.
+# 'summary' holds one row per project and marks which data_version the store was built from.
+TREND_DEFINITIONS = {
+    'summary': ("'all'", '1'),
+    'thumbnail_color': ('dominant_color', "COALESCE(dominant_color, '') != ''"),
+    'caption_length': ('caption_length_bucket', 'caption_length_bucket IS NOT NULL'),
+}
+
+_project_refresh_pending = set()
+_project_refresh_lock = threading.Lock()
+_project_refresh_running = False
+
+def materialize_trends(db, project_id):
+    """Rebuild one project's rows in the trends table (the caller commits)"""
+    project = db.execute('SELECT data_version FROM projects WHERE id = ?', (project_id,)).fetchone()
+    db.execute('DELETE FROM trends WHERE project_id = ?', (project_id,))
+    if project is None:
+        return
     
-    if similar_posts and similar_posts['similar_count'] >= 3:
-        # Use similar posts data
-        predicted_score = similar_posts['avg_score']
-        predicted_engagement = similar_posts['avg_engagement']
-        confidence = min(95, 50 + (similar_posts['similar_count'] * 5))
-    else:
-        # Use baseline with adjustments
-        predicted_score = baseline['avg_score'] or 20
-        predicted_engagement = baseline['avg_engagement'] or 5
-        confidence = 30
+    select = ' UNION ALL '.join(
+        f'''SELECT '{trend_type}', {expression}, AVG(performance_score), AVG(engagement_rate_weighted), COUNT(*)
+            FROM posts WHERE project_id = ? AND {condition} GROUP BY 2'''
+        for trend_type, (expression, condition) in TREND_DEFINITIONS.items()
+    )
+    rows = db.execute(select, (project_id,) * len(TREND_DEFINITIONS)).fetchall()
+    if not any(row[0] == 'summary' for row in rows):
+        rows.append(('summary', 'all', None, None, 0))
+    
+    updated_at = datetime.now().isoformat()
+    db.executemany('''
+        INSERT INTO trends (project_id, trend_type, trend_value, avg_performance_score, avg_engagement, post_count, data_version, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(project_id, *row, project['data_version'], updated_at) for row in rows])
+
+def _project_refresh_worker():
+    global _project_refresh_running
+    while True:
+        with _project_refresh_lock:
+            if not _project_refresh_pending:
+                _project_refresh_running = False
+                return
+            project_id = _project_refresh_pending.pop()
+        try:
+            with app.app_context():
+                db = get_db_connection()
+                materialize_trends(db, project_id)
+                if anomaly_baselines_stale(db, project_id):
+                    rebuild_anomaly_baselines(db, project_id)
+                # Only projects whose report has been opened keep a snapshot worth rebuilding
+                if db.execute('SELECT 1 FROM reports WHERE project_id = ? AND payload IS NOT NULL LIMIT 1', (project_id,)).fetchone():
+                    refresh_report_snapshot(db, project_id)
+                if db.execute('SELECT 1 FROM prediction_models WHERE project_id = ?', (project_id,)).fetchone():
+                    refit_prediction_model(db, project_id)
+                db.commit()
+                db.close()
+        except Exception as e:
+            print(f"Error refreshing project {project_id}: {str(e)}")
+
+def schedule_project_refresh(project_ids):
+    """Queue projects for trend, anomaly baseline, report snapshot and prediction model refresh after their posts changed"""
+    global _project_refresh_running
+    with _project_refresh_lock:
+        _project_refresh_pending.update(project_ids)
+        if _project_refresh_running:
+            return
+        _project_refresh_running = True
+    threading.Thread(target=_project_refresh_worker, daemon=True).start()
+
+def read_trends(db, project_ids_str, trend_type):
+    """Combine stored trends across projects, or return None if any project's store is stale"""
+    stale = db.execute(f'''
+        SELECT COUNT(*) FROM projects pr
+        WHERE pr.id IN ({project_ids_str})
+        AND NOT EXISTS (
+            SELECT 1 FROM trends t
+            WHERE t.project_id = pr.id AND t.trend_type = 'summary' AND t.data_version = pr.data_version
+        )
+    ''').fetchone()[0]
+    if stale:
+        return None
     
     return {
-        'predicted_score': round(predicted_score, 1),
-        'predicted_engagement': round(predicted_engagement, 2),
-        'confidence': confidence,
-        'similar_posts': similar_posts['similar_count'] if similar_posts else 0
+        row['trend_value']: {
+            'post_count': row['post_count'],
+            'avg_score': (row['score_total'] or 0) / row['post_count'],
+            'avg_engagement': (row['engagement_total'] or 0) / row['post_count']
+        }
+        for row in db.execute(f'''
+            SELECT trend_value, SUM(post_count) as post_count,
+                SUM(avg_performance_score * post_count) as score_total,
+                SUM(avg_engagement * post_count) as engagement_total
+            FROM trends
+            WHERE project_id IN ({project_ids_str}) AND trend_type = ?
+            GROUP BY trend_value
+        ''', (trend_type,))
+        if row['post_count']
     }
 
-def analyze_growth_trends(project_ids_str, db):
-    """Analyze growth trends and provide insights"""
-    # Get monthly growth data
-    monthly_growth = db.execute(f'''
-        SELECT 
-            strftime('%Y-%m', post_date) as month,
-            AVG(performance_score) as avg_score,
-            AVG(engagement_rate_weighted) as avg_engagement,
-            SUM(followers_gained) as followers_gained,
-            COUNT(*) as post_count
-        FROM posts 
-        WHERE project_id IN ({project_ids_str})
-        GROUP BY month
-        ORDER BY month
-    ''').fetchall()
+# Prediction model: an additive shrinkage (ridge) model over categorical post features, fitted per
+# project by backfitting. Each factor level's effect is pulled toward zero by `prior_strength`
+# pseudo-posts, so rare levels fall back to the project average instead of overfitting.
+PREDICTION_FACTORS = ['post_type', 'hour', 'weekday', 'category', 'length', 'cta', 'hashtags', 'reel', 'combo']
+PREDICTION_MODEL_COLUMNS = '''
+    post_type, post_hour, post_weekday, caption_category, caption_length_bucket,
+    caption_cta, caption_hashtags, reel_length, performance_score, engagement_rate_weighted
+'''
+
+_prediction_models = {}
+
+def _hashtag_bucket(count):
+    if count == 0:
+        return '0'
+    return '1-3' if count <= 3 else '4-10' if count <= 10 else '11+'
+
+def _reel_bucket(seconds):
+    if not seconds:
+        return None
+    return '<15s' if seconds < 15 else '15-30s' if seconds < 30 else '30-60s' if seconds < 60 else '60s+'
+
+def prediction_features(post_type=None, hour=None, weekday=None, category=None, length_bucket=None,
+                        cta=None, hashtag_count=None, reel_length=None):
+    """Factor levels the prediction model understands; unknown inputs are left out"""
+    levels = {
+        'post_type': post_type,
+        'hour': hour,
+        'weekday': weekday,
+        'category': category,
+        'length': length_bucket,
+        'cta': cta,
+        'hashtags': _hashtag_bucket(hashtag_count) if hashtag_count is not None else None,
+        'reel': _reel_bucket(reel_length),
+        'combo': f'{post_type}|{hour}|{category}' if None not in (post_type, hour, category) else None
+    }
+    return {name: str(level) for name, level in levels.items() if level is not None}
+
+def _row_prediction_features(row):
+    hashtags = row['caption_hashtags']
+    return prediction_features(
+        row['post_type'], row['post_hour'], row['post_weekday'], row['caption_category'],
+        row['caption_length_bucket'], row['caption_cta'],
+        len(hashtags.split()) if hashtags is not None else None, row['reel_length']
+    )
+
+def fit_prediction_model(rows, prior_strength, previous=None, max_iterations=100, tolerance=1e-4):
+    """Fit score and weighted-engagement effects for every factor level; returns None without rows.
+
+    `previous` (an earlier fit) warm-starts the effects, so refits after small changes converge in a
+    few sweeps.
+    """
+    samples = [(_row_prediction_features(row), (row['performance_score'] or 0, row['engagement_rate_weighted'] or 0)) for row in rows]
+    if not samples:
+        return None
+    n = len(samples)
     
-    if len(monthly_growth) < 2:
-        return {'trend': 'insufficient_data', 'growth_rate': 0, 'insights': []}
+    # Per factor: the level of each sample that has one, and how many samples share each level
+    members = {factor: [] for factor in PREDICTION_FACTORS}
+    counts = {factor: {} for factor in PREDICTION_FACTORS}
+    for index, (levels, _) in enumerate(samples):
+        for factor, level in levels.items():
+            members[factor].append((index, level))
+            counts[factor][level] = counts[factor].get(level, 0) + 1
     
-    # Calculate growth rate (comparing last 2 months)
-    recent = monthly_growth[-1]
-    previous = monthly_growth[-2]
+    start = (previous or {}).get('factors', {})
+    effects = {
+        factor: {level: list(start.get(factor, {}).get(level, (0.0, 0.0))[:2]) for level in counts[factor]}
+        for factor in PREDICTION_FACTORS
+    }
+    fitted = [[0.0, 0.0] for _ in samples]
+    for factor, pairs in members.items():
+        for index, level in pairs:
+            effect = effects[factor][level]
+            fitted[index][0] += effect[0]
+            fitted[index][1] += effect[1]
+    targets = [y for _, y in samples]
+    intercept = [sum(y[t] - fit[t] for y, fit in zip(targets, fitted)) / n for t in (0, 1)]
     
-    score_change = ((recent['avg_score'] - previous['avg_score']) / previous['avg_score']) * 100
-    engagement_change = ((recent['avg_engagement'] - previous['avg_engagement']) / previous['avg_engagement']) * 100
+    for iteration in range(1, max_iterations + 1):
+        change = 0.0
+        for factor, pairs in members.items():
+            level_effects = effects[factor]
+            sums = {level: [0.0, 0.0] for level in level_effects}
+            for index, level in pairs:
+                y, fit, effect, acc = targets[index], fitted[index], level_effects[level], sums[level]
+                acc[0] += y[0] - intercept[0] - fit[0] + effect[0]
+                acc[1] += y[1] - intercept[1] - fit[1] + effect[1]
+    
+            deltas = {}
+            for level, acc in sums.items():
+                weight = counts[factor][level] + prior_strength
+                old = level_effects[level]
+                new = [acc[0] / weight, acc[1] / weight]
+                deltas[level] = (new[0] - old[0], new[1] - old[1])
+                change = max(change, abs(deltas[level][0]), abs(deltas[level][1]))
+                level_effects[level] = new
+            for index, level in pairs:
+                delta = deltas[level]
+                fitted[index][0] += delta[0]
+                fitted[index][1] += delta[1]
+    
+        intercept = [sum(y[t] - fit[t] for y, fit in zip(targets, fitted)) / n for t in (0, 1)]
+        if change < tolerance:
+            break
+    
+    sigma2 = [
+        sum((y[t] - intercept[t] - fit[t]) ** 2 for y, fit in zip(targets, fitted)) / max(n - 1, 1)
+        for t in (0, 1)
+    ]
+    return {
+        'n': n,
+        'prior_strength': prior_strength,
+        'iterations': iteration,
+        'intercept': intercept,
+        'sigma2': sigma2,
+        'factors': {
+            factor: {level: [effect[0], effect[1], counts[factor][level]] for level, effect in level_effects.items()}
+            for factor, level_effects in effects.items()
+        }
+    }
+
+def refit_prediction_model(db, project_id):
+    """Refit a project's model from its posts, warm-started from the last fit (the caller commits)"""
+    project = db.execute('SELECT data_version FROM projects WHERE id = ?', (project_id,)).fetchone()
+    previous = _prediction_models.get(project_id)
+    rows = db.execute(f'SELECT {PREDICTION_MODEL_COLUMNS} FROM posts WHERE project_id = ?', (project_id,)) if project else []
+    model = fit_prediction_model(rows, app.config['PREDICTION_PRIOR_STRENGTH'], previous)
+    if model is None:
+        db.execute('DELETE FROM prediction_models WHERE project_id = ?', (project_id,))
+        _prediction_models.pop(project_id, None)
+        return None
+    
+    model['data_version'] = project['data_version']
+    db.execute(
+        'INSERT OR REPLACE INTO prediction_models (project_id, data_version, model, fitted_at) VALUES (?, ?, ?, ?)',
+        (project_id, project['data_version'], zlib.compress(json.dumps(model).encode()), datetime.now().isoformat())
+    )
+    _prediction_models[project_id] = model
+    return model
+
+def get_prediction_model(db, project_id, data_version):
+    """In-memory model for a project; a stale one is served while the refresh worker refits it"""
+    model = _prediction_models.get(project_id)
+    if model is None:
+        row = db.execute('SELECT model FROM prediction_models WHERE project_id = ?', (project_id,)).fetchone()
+        if row is not None:
+            model = _prediction_models[project_id] = json.loads(zlib.decompress(row['model']))
+    if model is None:
+        model = refit_prediction_model(db, project_id)
+        db.commit()
+    elif model['data_version'] != data_version:
+        schedule_project_refresh([project_id])
+    return model
+
+def predict_from_models(models, levels):
+    """Mean, variance of the mean and residual variance for (score, engagement), pooled across models by size"""
+    models = [model for model in models if model]
+    total = sum(model['n'] for model in models)
+    if not total:
+        return None
+    
+    mean, mean_var, noise_var, second_moment = [0.0, 0.0], [0.0, 0.0], [0.0, 0.0], [0.0, 0.0]
+    for model in models:
+        weight = model['n'] / total
+        sigma2, strength = model['sigma2'], model['prior_strength']
+        estimate = list(model['intercept'])
+        variance = [sigma2[t] / model['n'] for t in (0, 1)]
+        for factor, level in levels.items():
+            entry = model['factors'].get(factor, {}).get(level)
+            for t in (0, 1):
+                if entry:
+                    estimate[t] += entry[t]
+                    variance[t] += sigma2[t] / (entry[2] + strength)
+                else:
+                    # Unseen level: the effect is unknown, so only its prior variance remains
+                    variance[t] += sigma2[t] / strength
+        for t in (0, 1):
+            mean[t] += weight * estimate[t]
+            second_moment[t] += weight * estimate[t] ** 2
+            mean_var[t] += weight * variance[t]
+            noise_var[t] += weight * sigma2[t]
+    # Disagreement between projects adds to the uncertainty of the pooled estimate
+    mean_var = [mean_var[t] + second_moment[t] - mean[t] ** 2 for t in (0, 1)]
+    return mean, mean_var, noise_var
+
+def load_prediction_models(db, project_ids_str):
+    """Current (or briefly stale) models for each of the given projects"""
+    projects = db.execute(f'SELECT id, data_version FROM projects WHERE id IN ({project_ids_str})').fetchall()
+    return [get_prediction_model(db, project['id'], project['data_version']) for project in projects]
+
+def candidate_prediction_features(post_type, post_hour, caption_category, weekday=None, caption=None, reel_length=None):
+    """Model factor levels for a candidate post, deriving caption features from its text"""
+    features = extract_caption_features(caption) if caption is not None else {}
+    hashtags = features.get('caption_hashtags')
+    return prediction_features(
+        post_type, post_hour, weekday, caption_category, features.get('caption_length_bucket'),
+        features.get('caption_cta'), len(hashtags.split()) if hashtags is not None else None, reel_length
+    )
+
+def predict_post_performance(post_type, post_hour, caption_category, project_ids_str, db,
+                             weekday=None, caption=None, reel_length=None):
+    """Predict post performance from the projects' fitted models"""
+    models = load_prediction_models(db, project_ids_str)
+    levels = candidate_prediction_features(post_type, post_hour, caption_category, weekday, caption, reel_length)
+    return _prediction_result(predict_from_models(models, levels), models, levels)
+
+def predict_candidates(candidates, project_ids_str, db):
+    """Predict every candidate dict (type, hour, weekday, category, caption, reel_length) with one model load"""
+    models = load_prediction_models(db, project_ids_str)
+    predictions = []
+    for candidate in candidates:
+        levels = candidate_prediction_features(
+            candidate['type'], candidate['hour'], candidate['category'],
+            candidate.get('weekday'), candidate.get('caption'), candidate.get('reel_length')
+        )
+        predictions.append(dict(candidate, **_prediction_result(predict_from_models(models, levels), models, levels)))
+    return predictions
+
+def _prediction_result(prediction, models, levels):
+    if prediction is None:
+        return {
+            'predicted_score': 20, 'predicted_engagement': 5, 'confidence': 0, 'similar_posts': 0,
+            'score_interval': None, 'engagement_interval': None, 'std_error': None
+        }
+    
+    mean, mean_var, noise_var = prediction
+    intervals = []
+    for t in (0, 1):
+        spread = 1.96 * math.sqrt(mean_var[t] + noise_var[t])
+        intervals.append([round(max(mean[t] - spread, 0), 1), round(mean[t] + spread, 1)])
+    # Confidence is the share of the score's predictive variance that is irreducible post-to-post
+    # noise rather than uncertainty about the estimate itself
+    confidence = round(100 * noise_var[0] / (noise_var[0] + mean_var[0])) if noise_var[0] + mean_var[0] else 0
+    combo = levels.get('combo')
+    return {
+        'predicted_score': round(max(mean[0], 0), 1),
+        'predicted_engagement': round(max(mean[1], 0), 2),
+        'confidence': min(confidence, 95),
+        'similar_posts': sum(
+            model['factors']['combo'].get(combo, (0, 0, 0))[2] for model in models if model
+        ) if combo else 0,
+        'score_interval': intervals[0],
+        'engagement_interval': intervals[1],
+        'std_error': round(math.sqrt(mean_var[0]), 2)
+    }
+
+# Time series are resampled from the 'day' rollups, so building them costs O(days) rather than O(posts)
+SERIES_FREQUENCIES = ['day', 'week', 'month']
+SERIES_ROLLING_WINDOWS = {'day': 7, 'week': 4, 'month': 3}
+SERIES_EWMA_ALPHA = 0.3
+SERIES_METRICS = ['score', 'engagement']
+
+def _series_period(day, frequency):
+    """Label and start date of the period a day falls in"""
+    if frequency == 'week':
+        iso_year, iso_week, _ = day.isocalendar()
+        return f'{iso_year}-W{iso_week:02d}', day - timedelta(days=day.weekday())
+    if frequency == 'month':
+        return day.strftime('%Y-%m'), day.replace(day=1)
+    return day.isoformat(), day
+
+def _next_period(start, frequency):
+    if frequency == 'week':
+        return start + timedelta(days=7)
+    if frequency == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+def read_day_rollups(db, project_ids_str, start_date=None, end_date=None):
+    """{date: day rollup row} for the given projects and optional YYYY-MM-DD range, skipping invalid dates"""
+    days = {}
+    for bucket, row in read_rollups(db, project_ids_str, 'day', start_date, end_date).items():
+        try:
+            days[datetime.fromisoformat(bucket).date()] = row
+        except ValueError:
+            continue
+    return days
+
+def resample_rollups(days, frequency):
+    """Sum {date: day rollup row} into consecutive periods; periods without posts have None averages"""
+    totals = {}
+    for day, row in days.items():
+        period = _series_period(day, frequency)[1]
+        acc = totals.get(period)
+        if acc is None:
+            acc = totals[period] = dict.fromkeys(['post_count'] + [name for name, _ in ROLLUP_SUMS], 0)
+        for name in acc:
+            acc[name] += row[name] or 0
+    if not totals:
+        return []
+    
+    series = []
+    period, last = min(totals), max(totals)
+    while period <= last:
+        acc = totals.get(period) or {}
+        count = acc.get('post_count', 0)
+        series.append({
+            'period': _series_period(period, frequency)[0],
+            'start': period.isoformat(),
+            'count': count,
+            'score': acc['score_sum'] / count if count else None,
+            'engagement': acc['weighted_engagement_sum'] / count if count else None,
+            'engagement_rate': acc['engagement_sum'] / count if count else None,
+            'reach': acc.get('reach_sum', 0),
+            'followers': acc.get('followers_sum', 0)
+        })
+        period = _next_period(period, frequency)
+    return series
+
+def rolling_mean(values, window):
+    """Trailing mean over the last `window` periods, skipping empty (None) periods"""
+    means = []
+    total, count = 0.0, 0
+    for i, value in enumerate(values):
+        if value is not None:
+            total += value
+            count += 1
+        if i >= window and values[i - window] is not None:
+            total -= values[i - window]
+            count -= 1
+        means.append(total / count if count else None)
+    return means
+
+def ewma(values, alpha):
+    """Exponentially weighted mean; empty periods carry the previous value forward"""
+    smoothed = []
+    current = None
+    for value in values:
+        if value is not None:
+            current = value if current is None else current + alpha * (value - current)
+        smoothed.append(current)
+    return smoothed
+
+def lttb_indices(series, threshold):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps when reducing value lists to `threshold` points.
+
+    All lists share the selection: each is scaled to its own range and the triangle areas are summed,
+    so a spike in any metric survives. Empty (None) values add no area.
+    """
+    length = len(series[0]) if series else 0
+    if threshold >= length or threshold < 3:
+        return list(range(length))
+    
+    scaled = []
+    for values in series:
+        present = [value for value in values if value is not None]
+        low, span = (min(present), (max(present) - min(present)) or 1) if present else (0, 1)
+        scaled.append([(value - low) / span if value is not None else None for value in values])
+    
+    def mean_at(values, start, end):
+        present = [value for value in values[start:end] if value is not None]
+        return sum(present) / len(present) if present else None
+    
+    # The first and last points are always kept; the rest are split into threshold - 2 buckets
+    selected = [0]
+    bucket_size = (length - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_start, next_end = end, min(int((bucket + 2) * bucket_size) + 1, length)
+        if next_start >= next_end:
+            next_start, next_end = length - 1, length
+        next_x = (next_start + next_end - 1) / 2
+        next_y = [mean_at(values, next_start, next_end) for values in scaled]
+        
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            area = 0.0
+            for values, target in zip(scaled, next_y):
+                a, b = values[previous], values[index]
+                if a is None or b is None or target is None:
+                    continue
+                area += abs((previous - next_x) * (b - a) - (previous - index) * (target - a))
+            if area > best_area:
+                best, best_area = index, area
+        selected.append(best)
+        previous = best
+    selected.append(length - 1)
+    return selected
+
+def period_changes(values):
+    """Percent change from the previous period; None when either period is empty or the previous is zero"""
+    return [None] + [
+        (current - previous) / previous * 100 if current is not None and previous else None
+        for previous, current in zip(values, values[1:])
+    ]
+
+def weekday_seasonality(daily, metric, window=7):
+    """Additive weekday effects: the mean gap between each day's value and its centred rolling mean"""
+    values = [point[metric] for point in daily]
+    half = window // 2
+    gaps = [[] for _ in WEEKDAY_NAMES]
+    # The daily series has no gaps, so weekdays follow on from the first day
+    first_weekday = datetime.fromisoformat(daily[0]['start']).weekday() if daily else 0
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        around = [other for other in values[max(i - half, 0):i + half + 1] if other is not None]
+        gaps[(first_weekday + i) % 7].append(value - sum(around) / len(around))
+    
+    effects = [sum(gap) / len(gap) if gap else None for gap in gaps]
+    present = [effect for effect in effects if effect is not None]
+    # Centre the effects so they describe each weekday relative to an average day
+    offset = sum(present) / len(present) if present else 0
+    return [effect - offset if effect is not None else None for effect in effects]
+
+def build_time_series(db, project_ids_str, start_date=None, end_date=None):
+    """Daily, weekly and monthly series with rolling means, EWMA, period changes and weekday seasonality"""
+    days = read_day_rollups(db, project_ids_str, start_date, end_date)
+    result = {}
+    for frequency in SERIES_FREQUENCIES:
+        series = resample_rollups(days, frequency)
+        for metric in SERIES_METRICS:
+            values = [point[metric] for point in series]
+            derived = zip(
+                rolling_mean(values, SERIES_ROLLING_WINDOWS[frequency]),
+                ewma(values, SERIES_EWMA_ALPHA),
+                period_changes(values)
+            )
+            for point, (rolling, smoothed, change) in zip(series, derived):
+                point[f'{metric}_rolling'] = rolling
+                point[f'{metric}_ewma'] = smoothed
+                point[f'{metric}_change'] = change
+        result[frequency] = series
+    
+    effects = {metric: weekday_seasonality(result['day'], metric) for metric in SERIES_METRICS}
+    result['seasonality'] = [
+        {'day': name, **{metric: effects[metric][weekday] for metric in SERIES_METRICS}}
+        for weekday, name in enumerate(WEEKDAY_NAMES)
+    ]
+    return result
+
+# Chart metrics, named as in resample_rollups: averages per post except count, reach and followers (totals)
+CHART_METRICS = ['count', 'score', 'engagement', 'engagement_rate', 'reach', 'followers']
+CHART_MAX_POINTS = 5000
+
+def chart_series(db, project_ids_str, metrics, frequency='day', start_date=None, end_date=None, max_points=None):
+    """Gap-filled series of several metrics per period, reduced to max_points with LTTB when longer"""
+    series = resample_rollups(read_day_rollups(db, project_ids_str, start_date, end_date), frequency)
+    total = len(series)
+    if max_points:
+        series = [series[index] for index in lttb_indices([[point[metric] for point in series] for metric in metrics], max_points)]
+    return {
+        'frequency': frequency,
+        'periods': [point['period'] for point in series],
+        'starts': [point['start'] for point in series],
+        'series': {metric: [_round_or_none(point[metric], 2) for point in series] for metric in metrics},
+        'total_periods': total,
+        'downsampled': len(series) < total
+    }
+
+def engagement_baseline(series):
+    """{date: expected weighted engagement} from the daily EWMA up to the day before; '' holds the overall mean"""
+    daily = series['day']
+    count = sum(point['count'] for point in daily)
+    baseline = {'': sum(point['engagement'] * point['count'] for point in daily if point['count']) / count if count else 0}
+    previous = None
+    for point in daily:
+        expected = previous if previous is not None else point['engagement_ewma']
+        if expected is not None:
+            baseline[point['start']] = expected
+        previous = point['engagement_ewma']
+    return baseline
+
+def _round_or_none(value, digits):
+    return round(value, digits) if value is not None else None
+
+def report_trends(series):
+    """The report's monthly and weekly trends, growth summary and weekday seasonality from a time series"""
+    def trend_points(points, label):
+        return [{
+            label: point['period'],
+            'score': round(point['score'], 1),
+            'engagement': round(point['engagement'], 2),
+            'followers': point['followers'],
+            'count': point['count'],
+            'score_rolling': _round_or_none(point['score_rolling'], 1),
+            'engagement_ewma': _round_or_none(point['engagement_ewma'], 2),
+            'score_change': _round_or_none(point['score_change'], 1),
+            'engagement_change': _round_or_none(point['engagement_change'], 1)
+        } for point in points if point['count']]
+    
+    monthly_trends = trend_points(series['month'], 'month')
+    growth_trends = {'trend': 'insufficient_data', 'growth_rate': 0, 'insights': []}
+    if len(monthly_trends) >= 2:
+        recent, previous = series['month'][-1], [point for point in series['month'] if point['count']][-2]
+        growth_trends = _growth_from_months(
+            recent['score'], previous['score'], recent['engagement'], previous['engagement']
+        )
+    weeks = series['week']
+    if len(weeks) >= 2:
+        growth_trends['week_over_week'] = {
+            'score': _round_or_none(weeks[-1]['score_change'], 1),
+            'engagement': _round_or_none(weeks[-1]['engagement_change'], 1)
+        }
+    
+    return {
+        'monthly_trends': monthly_trends,
+        'weekly_trends': trend_points(weeks, 'week'),
+        'growth_trends': growth_trends,
+        'weekday_seasonality': [
+            {'day': item['day'], **{metric: _round_or_none(item[metric], 2) for metric in SERIES_METRICS}}
+            for item in series['seasonality']
+        ]
+    }
+
+def _percent_change(current, previous):
+    return ((current - previous) / previous) * 100 if previous else 0
+
+def _growth_from_months(recent_score, previous_score, recent_engagement, previous_engagement):
+    """Turn two consecutive monthly averages into a growth trend summary"""
+    score_change = _percent_change(recent_score or 0, previous_score or 0)
+    engagement_change = _percent_change(recent_engagement or 0, previous_engagement or 0)
     
     insights = []
     if score_change > 10:
@@ -271,18 +1723,11 @@ def generate_smart_recommendations(project_ids_str, db):
     recommendations = []
     
     # Best posting times recommendation
-    best_times = db.execute(f'''
-        SELECT 
-            CAST(substr(post_time, 1, 2) AS INTEGER) as hour,
-            AVG(engagement_rate_weighted) as avg_engagement,
-            COUNT(*) as post_count
-        FROM posts 
-        WHERE project_id IN ({project_ids_str})
-        GROUP BY hour
-        HAVING post_count >= 2
-        ORDER BY avg_engagement DESC
-        LIMIT 3
-    ''').fetchall()
+    best_times = sorted([
+        {'hour': int(hour), 'avg_engagement': row['weighted_engagement_sum'] / row['post_count'], 'post_count': row['post_count']}
+        for hour, row in read_rollups(db, project_ids_str, 'hour').items()
+        if hour and row['post_count'] >= 2
+    ], key=lambda item: item['avg_engagement'], reverse=True)[:3]
     
     if best_times:
         top_hour = best_times[0]['hour']
@@ -294,16 +1739,11 @@ def generate_smart_recommendations(project_ids_str, db):
         })
     
     # Content type recommendations
-    content_performance = db.execute(f'''
-        SELECT 
-            post_type,
-            AVG(performance_score) as avg_score,
-            COUNT(*) as count
-        FROM posts 
-        WHERE project_id IN ({project_ids_str})
-        GROUP BY post_type
-        ORDER BY avg_score DESC
-    ''').fetchall()
+    content_performance = sorted([
+        {'post_type': post_type, 'avg_score': row['score_sum'] / row['post_count'], 'count': row['post_count']}
+        for post_type, row in read_rollups(db, project_ids_str, 'post_type').items()
+        if row['post_count'] > 0
+    ], key=lambda item: item['avg_score'], reverse=True)
     
     if len(content_performance) > 1:
         best_type = content_performance[0]
@@ -316,22 +1756,25 @@ def generate_smart_recommendations(project_ids_str, db):
                 'description': f'{best_type["post_type"]} posts score {best_type["avg_score"]:.1f} vs {worst_type["avg_score"]:.1f} for {worst_type["post_type"]}'
             })
     
-    # Caption length optimization
-    caption_analysis = db.execute(f'''
-        SELECT 
-            CASE 
-                WHEN LENGTH(caption) < 50 THEN 'Short'
-                WHEN LENGTH(caption) < 150 THEN 'Medium'
-                ELSE 'Long'
-            END as caption_length,
-            AVG(engagement_rate_weighted) as avg_engagement,
-            COUNT(*) as count
-        FROM posts 
-        WHERE project_id IN ({project_ids_str})
-        AND caption IS NOT NULL
-        GROUP BY caption_length
-        ORDER BY avg_engagement DESC
-    ''').fetchall()
+    # Caption length optimization (trend store, or a live scan if it is stale)
+    caption_trends = read_trends(db, project_ids_str, 'caption_length')
+    if caption_trends is not None:
+        caption_analysis = sorted([
+            {'caption_length': length, 'avg_engagement': trend['avg_engagement'], 'count': trend['post_count']}
+            for length, trend in caption_trends.items()
+        ], key=lambda item: item['avg_engagement'], reverse=True)
+    else:
+        caption_analysis = db.execute(f'''
+            SELECT 
+                caption_length_bucket as caption_length,
+                AVG(engagement_rate_weighted) as avg_engagement,
+                COUNT(*) as count
+            FROM posts 
+            WHERE project_id IN ({project_ids_str})
+            AND caption_length_bucket IS NOT NULL
+            GROUP BY caption_length
+            ORDER BY avg_engagement DESC
+        ''').fetchall()
     
     if caption_analysis and caption_analysis[0]['count'] >= 3:
         best_length = caption_analysis[0]
@@ -342,10 +1785,58 @@ def generate_smart_recommendations(project_ids_str, db):
             'description': f'{best_length["avg_engagement"]:.1f}% engagement with {best_length["caption_length"].lower()} captions'
         })
     
+    # Thumbnail colour style (trend store, or the covering colour index if it is stale)
+    color_trends = read_trends(db, project_ids_str, 'thumbnail_color')
+    if color_trends is not None:
+        color_analysis = sorted([
+            {'style': style, 'avg_score': trend['avg_score'], 'count': trend['post_count']}
+            for style, trend in color_trends.items()
+        ], key=lambda item: item['avg_score'], reverse=True)
+    else:
+        color_analysis = db.execute(f'''
+            SELECT dominant_color as style, AVG(performance_score) as avg_score, COUNT(*) as count
+            FROM posts
+            WHERE project_id IN ({project_ids_str})
+            AND COALESCE(dominant_color, '') != ''
+            GROUP BY dominant_color
+            ORDER BY avg_score DESC
+        ''').fetchall()
+    
+    if len(color_analysis) > 1 and min(color_analysis[0]['count'], color_analysis[-1]['count']) >= 3:
+        best_style, worst_style = color_analysis[0], color_analysis[-1]
+        if (best_style['avg_score'] or 0) > (worst_style['avg_score'] or 0) * 1.2:
+            recommendations.append({
+                'type': 'thumbnail',
+                'priority': 'low',
+                'title': f'{best_style["style"]} thumbnails perform best',
+                'description': f'{best_style["style"]} thumbnails score {best_style["avg_score"]:.1f} vs {worst_style["avg_score"]:.1f} for {worst_style["style"].lower()} ones'
+            })
+    
+    # Call-to-action markers (stored caption features)
+    cta_analysis = {
+        row['caption_cta']: row
+        for row in db.execute(f'''
+            SELECT caption_cta, AVG(engagement_rate_weighted) as avg_engagement, COUNT(*) as count
+            FROM posts 
+            WHERE project_id IN ({project_ids_str})
+            AND caption_cta IS NOT NULL
+            GROUP BY caption_cta
+        ''')
+    }
+    with_cta, without_cta = cta_analysis.get(1), cta_analysis.get(0)
+    if with_cta and without_cta and min(with_cta['count'], without_cta['count']) >= 3:
+        if (with_cta['avg_engagement'] or 0) > (without_cta['avg_engagement'] or 0) * 1.2:
+            recommendations.append({
+                'type': 'caption',
+                'priority': 'low',
+                'title': 'Keep adding calls to action',
+                'description': f'Posts with a call to action average {with_cta["avg_engagement"]:.1f}% engagement vs {without_cta["avg_engagement"]:.1f}% without'
+            })
+    
     # Posting frequency recommendation
     posting_frequency = db.execute(f'''
         SELECT 
-            strftime('%Y-%W', post_date) as week,
+            post_week as week,
             COUNT(*) as posts_per_week,
             AVG(engagement_rate_weighted) as avg_engagement
         FROM posts 
@@ -379,57 +1870,49 @@ def check_performance_alerts(project_ids_str, db):
     """Check for performance alerts and notifications"""
     alerts = []
     
-    # Get recent posts (last 7 days)
+    # Get recent posts (last 7 days) with the z-scores they were given against their post type's baseline
     recent_posts = db.execute(f'''
         SELECT 
             id, caption, post_type, post_date, 
-            performance_score, engagement_rate_weighted
+            performance_score, anomaly_score_z, anomaly_score_baseline
         FROM posts 
         WHERE project_id IN ({project_ids_str})
-        AND date(post_date) >= date('now', '-7 days')
+        AND post_date >= date('now', '-7 days')
         ORDER BY post_date DESC
     ''').fetchall()
     
     if not recent_posts:
         return alerts
     
-    # Get historical average for comparison
-    historical_avg = db.execute(f'''
-        SELECT 
-            AVG(performance_score) as avg_score,
-            AVG(engagement_rate_weighted) as avg_engagement
-        FROM posts 
-        WHERE project_id IN ({project_ids_str})
-        AND date(post_date) < date('now', '-7 days')
-    ''').fetchone()
-    
-    if not historical_avg or not historical_avg['avg_score']:
-        return alerts
-    
-    avg_score = historical_avg['avg_score']
-    avg_engagement = historical_avg['avg_engagement']
+    threshold = app.config['ANOMALY_Z_THRESHOLD']
     
-    for post in recent_posts:
+    # Largest deviations first; posts of a type still warming up have no z-score
+    for post in sorted(recent_posts, key=lambda post: -abs(post['anomaly_score_z'] or 0)):
+        z = post['anomaly_score_z']
+        if z is None or abs(z) < threshold:
+            continue
+        description = f'Score: {post["performance_score"]:.1f} ({post["post_type"]} baseline: {post["anomaly_score_baseline"]:.1f}, z = {z:+.1f})'
+        
         # Check for underperforming posts
-        if post['performance_score'] < avg_score * 0.7:  # 30% below average
+        if z < 0:
             alerts.append({
                 'type': 'underperforming',
                 'priority': 'medium',
                 'post_id': post['id'],
                 'title': f'{post["post_type"]} underperforming',
-                'description': f'Score: {post["performance_score"]:.1f} (avg: {avg_score:.1f})',
+                'description': description,
                 'date': post['post_date'],
                 'caption_preview': post['caption'][:40] + '...' if post['caption'] else 'No caption'
             })
         
         # Check for high-performing posts
-        elif post['performance_score'] > avg_score * 1.5:  # 50% above average
+        else:
             alerts.append({
                 'type': 'outperforming',
                 'priority': 'low',
                 'post_id': post['id'],
                 'title': f'{post["post_type"]} is a hit!',
-                'description': f'Score: {post["performance_score"]:.1f} (avg: {avg_score:.1f})',
+                'description': description,
                 'date': post['post_date'],
                 'caption_preview': post['caption'][:40] + '...' if post['caption'] else 'No caption'
             })
@@ -454,6 +1937,1047 @@ def check_performance_alerts(project_ids_str, db):
     
     return alerts
 
+# Sort options for post listings; rows are ordered by (column, id) so keyset pages never skip or repeat a post
+POST_SORT_COLUMNS = ['post_date', 'engagement_rate', 'performance_score', 'reach', 'likes']
+CAPTION_PREVIEW_LENGTH = 50
+
+# Only what the post tables display; captions are cut to one character past the preview to flag truncation
+POST_LIST_COLUMNS = f'''
+    id, project_id, post_type, post_date, post_time, SUBSTR(caption, 1, {CAPTION_PREVIEW_LENGTH + 1}) as caption_preview,
+    caption_category, likes, comments, shares, saves, reach, followers_gained, reel_length,
+    engagement_rate, engagement_rate_weighted, avd_ratio, performance_score, thumbnail_path,
+    (SELECT path FROM post_thumbnails t WHERE t.post_id = posts.id AND t.variant = 'list') as thumbnail_list_path
+'''
+
+def encode_post_cursor(row, sort_by):
+    """Opaque keyset cursor pointing just past a listed post"""
+    return base64.urlsafe_b64encode(json.dumps([row[sort_by], row['id']]).encode()).decode().rstrip('=')
+
+def decode_post_cursor(cursor):
+    """Return (sort value, post id) from a cursor, or None if it is malformed"""
+    try:
+        value, post_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return value, int(post_id)
+    except (ValueError, TypeError):
+        return None
+
+def fetch_post_page(db, project_ids_str, sort_by='post_date', order='desc', after=None, limit=50, hashtag=None):
+    """Fetch one page of posts after a decoded cursor; returns (rows, next cursor or None)"""
+    comparison = '<' if order == 'desc' else '>'
+    conditions, params = [], []
+    if hashtag:
+        conditions.append('AND id IN (SELECT ph.post_id FROM hashtag h JOIN post_hashtags ph ON ph.hashtag_id = h.id WHERE h.tag = ?)')
+        params.append(hashtag.lstrip('#').lower())
+    if after is not None:
+        conditions.append(f'AND ({sort_by}, id) {comparison} (?, ?)')
+        params.extend(after)
+    rows = db.execute(f'''
+        SELECT {POST_LIST_COLUMNS} FROM posts
+        WHERE project_id IN ({project_ids_str}) {' '.join(conditions)}
+        ORDER BY {sort_by} {order.upper()}, id {order.upper()}
+        LIMIT ?
+    ''', params + [limit + 1]).fetchall()
+    
+    if len(rows) > limit:
+        return rows[:limit], encode_post_cursor(rows[limit - 1], sort_by)
+    return rows, None
+
+def post_list_args(args):
+    """Validated (sort_by, order, cursor, limit) from listing query parameters"""
+    sort_by = args.get('sort', 'post_date')
+    if sort_by not in POST_SORT_COLUMNS:
+        sort_by = 'post_date'
+    order = args.get('order', 'desc')
+    if order not in ['asc', 'desc']:
+        order = 'desc'
+    limit = min(max(args.get('limit', app.config['POSTS_PAGE_SIZE'], type=int) or 1, 1), app.config['POSTS_PAGE_SIZE_MAX'])
+    return sort_by, order, args.get('after'), limit
+
+def post_totals(db, project_ids_str):
+    """Summary figures for a post listing, read from the rollups rather than the page"""
+    totals = read_rollups(db, project_ids_str, 'total').get('') if project_ids_str else None
+    count = totals['post_count'] if totals else 0
+    return {
+        'post_count': count,
+        'avg_engagement': totals['engagement_sum'] / count if count else 0,
+        'avg_score': totals['score_sum'] / count if count else 0,
+        'total_reach': totals['reach_sum'] if count else 0,
+        'total_followers': totals['followers_sum'] if count else 0
+    }
+
+# Columns the analytics engine reads from each post row
+ANALYTICS_COLUMNS = '''
+    p.id, p.post_type, p.post_date, p.post_time, p.caption, p.caption_category,
+    p.likes, p.comments, p.shares, p.saves, p.reach, p.followers_gained,
+    p.engagement_rate, p.engagement_rate_weighted, p.performance_score,
+    p.post_hour, p.post_weekday, p.post_month, p.thumbnail_path, p.caption_hashtags
+'''
+
+PERFORMANCE_BUCKETS = ['0-10', '10-20', '20-30', '30-40', '40-50', '50+']
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def _group_stats(groups, key, row):
+    """Fold one post row into the running totals for a group-by key"""
+    acc = groups.get(key)
+    if acc is None:
+        acc = groups[key] = {'count': 0, 'engagement': 0.0, 'weighted': 0.0, 'score': 0.0, 'reach': 0, 'followers': 0}
+    acc['count'] += 1
+    acc['engagement'] += row['engagement_rate'] or 0
+    acc['weighted'] += row['engagement_rate_weighted'] or 0
+    acc['score'] += row['performance_score'] or 0
+    acc['reach'] += row['reach'] or 0
+    acc['followers'] += row['followers_gained'] or 0
+
+def build_analytics(rows, velocity_limit=10, top_limit=5, engagement_baseline=None):
+    """Build every reports/project-report dataset in a single pass over post rows.
+
+    Velocity compares each post's weighted engagement with `engagement_baseline` (see
+    engagement_baseline()) for its date, or with the overall mean when no baseline is given.
+    """
+    by_date = {}
+    by_hour = {}
+    by_category = {}
+    by_type = {}
+    by_weekday = {}
+    by_hashtag = {}
+    distribution = [0] * len(PERFORMANCE_BUCKETS)
+    top_posts = []
+    best_posts = []
+    total_posts = 0
+    total_weighted = 0.0
+
+    for row in rows:
+        total_posts += 1
+        total_weighted += row['engagement_rate_weighted'] or 0
+        post_date = row['post_date']
+
+        _group_stats(by_date, post_date, row)
+        _group_stats(by_type, row['post_type'], row)
+        _group_stats(by_category, row['caption_category'] or 'Uncategorized', row)
+        if row['post_hour'] is not None:
+            _group_stats(by_hour, row['post_hour'], row)
+        if row['post_weekday'] is not None:
+            _group_stats(by_weekday, row['post_weekday'], row)
+
+        for hashtag in (row['caption_hashtags'] or '').split():
+            _group_stats(by_hashtag, hashtag, row)
+
+        score = row['performance_score'] or 0
+        distribution[min(max(int(score // 10), 0), len(PERFORMANCE_BUCKETS) - 1)] += 1
+
+        # Keep only the top posts by velocity: weighted engagement over what was typical on their date
+        velocity = row['engagement_rate_weighted'] or 0
+        if engagement_baseline is not None:
+            expected = engagement_baseline.get(post_date, engagement_baseline[''])
+            velocity = velocity / expected if expected > 0 else 0
+        entry = (velocity, row['id'], row)
+        if len(top_posts) < velocity_limit:
+            heapq.heappush(top_posts, entry)
+        elif entry[:2] > top_posts[0][:2]:
+            heapq.heapreplace(top_posts, entry)
+        
+        # ...and by performance score for the report summary
+        entry = (score, row['id'], row)
+        if len(best_posts) < top_limit:
+            heapq.heappush(best_posts, entry)
+        elif entry[:2] > best_posts[0][:2]:
+            heapq.heapreplace(best_posts, entry)
+
+    if not total_posts:
+        return {}
+
+    def avg(acc, field, digits=2):
+        return round(acc[field] / acc['count'], digits)
+
+    mean_weighted = total_weighted / total_posts
+    engagement_velocity = []
+    for velocity, post_id, row in sorted(top_posts, key=lambda entry: entry[:2], reverse=True):
+        weighted = row['engagement_rate_weighted'] or 0
+        if engagement_baseline is None:
+            velocity = weighted / mean_weighted if mean_weighted > 0 else 0
+        caption = row['caption'] or ''
+        engagement_velocity.append({
+            'post_id': post_id,
+            'type': row['post_type'],
+            'caption': caption[:40] + '...' if len(caption) > 40 else caption,
+            'velocity': round(velocity, 1),
+            'engagement': round(weighted, 2),
+            'date': row['post_date']
+        })
+
+    summary = {
+        'total_posts': total_posts,
+        'avg_score': sum(acc['score'] for acc in by_type.values()) / total_posts,
+        'avg_engagement': sum(acc['engagement'] for acc in by_type.values()) / total_posts,
+        'total_reach': sum(acc['reach'] for acc in by_type.values()),
+        'first_date': min(by_date),
+        'last_date': max(by_date),
+        'content_mix': [
+            {'type': post_type, 'count': acc['count'], 'percent': round(acc['count'] / total_posts * 100, 1)}
+            for post_type, acc in sorted(by_type.items())
+        ],
+        'top_posts': [{
+            'id': post_id,
+            'post_type': row['post_type'],
+            'caption': row['caption'] or '',
+            'post_date': row['post_date'],
+            'performance_score': score,
+            'engagement_rate': row['engagement_rate'] or 0,
+            'reach': row['reach'] or 0,
+            'thumbnail_path': row['thumbnail_path']
+        } for score, post_id, row in sorted(best_posts, key=lambda entry: entry[:2], reverse=True)]
+    }
+
+    return {
+        'engagement_over_time': [
+            {'date': date, 'engagement': avg(acc, 'engagement')}
+            for date, acc in sorted(by_date.items())
+        ],
+        'reach_over_time': [
+            {'date': date, 'reach': acc['reach']}
+            for date, acc in sorted(by_date.items())
+        ],
+        'performance_distribution': [
+            {'range': label, 'count': count}
+            for label, count in zip(PERFORMANCE_BUCKETS, distribution)
+        ],
+        'posting_time_analysis': [
+            {'hour': hour, 'engagement': avg(acc, 'weighted'), 'count': acc['count']}
+            for hour, acc in sorted(by_hour.items())
+        ],
+        'caption_category_performance': sorted([
+            {'category': category, 'score': avg(acc, 'score'), 'count': acc['count']}
+            for category, acc in by_category.items()
+        ], key=lambda item: item['score'], reverse=True),
+        'hashtag_performance': sorted([
+            {'hashtag': hashtag, 'count': acc['count'], 'score': avg(acc, 'score', 1), 'engagement': avg(acc, 'weighted', 1)}
+            for hashtag, acc in by_hashtag.items()
+        ], key=lambda item: (item['score'], item['count']), reverse=True),
+        'content_insights': sorted([
+            {'type': post_type, 'count': acc['count'], 'score': avg(acc, 'score', 1),
+             'engagement': avg(acc, 'engagement', 1), 'reach': acc['reach'] // acc['count']}
+            for post_type, acc in by_type.items()
+        ], key=lambda item: item['score'], reverse=True),
+        'day_of_week_analysis': [
+            {'day': WEEKDAY_NAMES[weekday], 'engagement': avg(acc, 'weighted'), 'count': acc['count']}
+            for weekday, acc in sorted(by_weekday.items())
+        ],
+        'engagement_velocity': engagement_velocity,
+        'summary': summary
+    }
+
+REPORT_SNAPSHOT_HISTORY = 5
+
+def _report_text(project_name, summary):
+    """Plain-text performance summary stored alongside each report snapshot"""
+    return (
+        f"This {project_name} project contains {summary['total_posts']} posts with an average performance score of "
+        f"{summary['avg_score']:.1f}. The content achieved a total reach of {summary['total_reach']:,} "
+        f"with an average engagement rate of {summary['avg_engagement']:.1f}%."
+    )
+
+def refresh_report_snapshot(db, project_id):
+    """Build a project's report and store it in reports (the caller commits); returns the snapshot or None"""
+    project = db.execute('SELECT project_name, data_version FROM projects WHERE id = ?', (project_id,)).fetchone()
+    analytics = {}
+    if project:
+        series = build_time_series(db, str(project_id))
+        analytics = build_analytics(
+            db.execute(f'SELECT {ANALYTICS_COLUMNS} FROM posts p WHERE p.project_id = ?', (project_id,)),
+            engagement_baseline=engagement_baseline(series)
+        )
+    if not analytics:
+        db.execute('DELETE FROM reports WHERE project_id = ?', (project_id,))
+        return None
+    
+    summary = analytics.pop('summary')
+    analytics.update(report_trends(series))
+    analytics['recommendations'] = generate_smart_recommendations(str(project_id), db)
+    payload = {'analytics': analytics, 'summary': summary}
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()
+    content_hash = hashlib.sha256(body).hexdigest()
+    report_date = datetime.now().isoformat(timespec='seconds')
+    
+    # Identical content only needs its version stamp moved forward
+    latest = db.execute(
+        'SELECT id, content_hash FROM reports WHERE project_id = ? ORDER BY id DESC LIMIT 1', (project_id,)
+    ).fetchone()
+    if latest and latest['content_hash'] == content_hash:
+        db.execute(
+            'UPDATE reports SET report_date = ?, data_version = ? WHERE id = ?',
+            (report_date, project['data_version'], latest['id'])
+        )
+    else:
+        db.execute('''
+            INSERT INTO reports (project_id, report_date, report_text, payload, content_hash, post_count, data_version)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (project_id, report_date, _report_text(project['project_name'], summary), zlib.compress(body),
+              content_hash, summary['total_posts'], project['data_version']))
+        db.execute('''
+            DELETE FROM reports WHERE project_id = ? AND id NOT IN (
+                SELECT id FROM reports WHERE project_id = ? ORDER BY id DESC LIMIT ?
+            )
+        ''', (project_id, project_id, REPORT_SNAPSHOT_HISTORY))
+    
+    return dict(payload, report_date=report_date, data_version=project['data_version'])
+
+def load_report_snapshot(db, project_id):
+    """Return the latest stored report snapshot for a project, or None"""
+    row = db.execute('''
+        SELECT report_date, data_version, payload FROM reports
+        WHERE project_id = ? AND payload IS NOT NULL
+        ORDER BY id DESC LIMIT 1
+    ''', (project_id,)).fetchone()
+    if row is None:
+        return None
+    return dict(json.loads(zlib.decompress(row['payload'])), report_date=row['report_date'], data_version=row['data_version'])
+
+def _report_job(db, project_id):
+    project = db.execute('SELECT data_version FROM projects WHERE id = ?', (project_id,)).fetchone()
+    report = load_report_snapshot(db, project_id)
+    if report is None or project is None or report['data_version'] != project['data_version']:
+        report = refresh_report_snapshot(db, project_id)
+    return report
+
+def _trends_job(db, project_id):
+    materialize_trends(db, project_id)
+    ids = str(int(project_id))
+    return {trend_type: read_trends(db, ids, trend_type) or {} for trend_type in TREND_DEFINITIONS}
+
+def _rollups_job(db, project_id):
+    rebuild_rollups(db, project_id)
+    ids = str(int(project_id))
+    return {
+        dimension: {bucket: dict(row) for bucket, row in read_rollups(db, ids, dimension).items()}
+        for dimension in ROLLUP_DIMENSIONS
+    }
+
+def _hashtags_job(db, project_id):
+    return hashtag_analytics(db, str(int(project_id)))
+
+def _thumbnails_job(db, project_id):
+    if Image is None:
+        return {'processed': 0, 'failed': 0, 'error': 'Pillow is not installed'}
+    # New uploads, plus earlier ones whose colours have not been measured yet
+    posts = db.execute('''
+        SELECT id, thumbnail_path, thumbnail_status, dominant_color,
+            (SELECT path FROM post_thumbnails t WHERE t.post_id = posts.id AND t.variant = 'list') as list_path
+        FROM posts
+        WHERE project_id = ? AND (thumbnail_status = 'pending' OR (thumbnail_status = 'ready' AND thumbnail_palette IS NULL))
+    ''', (project_id,)).fetchall()
+    processed = failed = 0
+    restyled = False
+    for post in posts:
+        if post['thumbnail_status'] == 'ready':
+            try:
+                palette = thumbnail_file_palette(post['list_path'] or post['thumbnail_path'])
+            except Exception as e:
+                print(f"Error reading thumbnail colours for post {post['id']}: {str(e)}")
+                palette = []
+            restyled |= _store_thumbnail_colors(db, post, palette)
+            processed += 1
+            db.commit()
+            continue
+        
+        # Identical uploads share a content-addressed file, so an already processed one is reused
+        shared = db.execute('''
+            SELECT id, thumbnail_width, thumbnail_height, thumbnail_palette FROM posts
+            WHERE thumbnail_path = ? AND thumbnail_status = 'ready' AND thumbnail_palette IS NOT NULL AND id != ?
+            LIMIT 1
+        ''', (post['thumbnail_path'], post['id'])).fetchone()
+        replaced = set()
+        try:
+            if shared is not None:
+                width, height = shared['thumbnail_width'], shared['thumbnail_height']
+                derivatives = {
+                    row['variant']: (row['path'], row['width'], row['height'], row['bytes'])
+                    for row in db.execute('SELECT * FROM post_thumbnails WHERE post_id = ?', (shared['id'],))
+                }
+                palette = json.loads(shared['thumbnail_palette'])
+                try:
+                    # Touch the reused derivatives so a concurrent reclaim treats them as new
+                    for path, *_ in derivatives.values():
+                        os.utime(os.path.join(app.config['UPLOAD_FOLDER'], path))
+                except OSError:
+                    shared = None  # Reclaimed already, so they are generated again
+            if shared is None:
+                (width, height), derivatives, palette = generate_thumbnail_derivatives(post['thumbnail_path'])
+        except Exception as e:
+            # Missing, unreadable or oversized images keep their original and are not retried
+            print(f"Error processing thumbnail for post {post['id']}: {str(e)}")
+            db.execute("UPDATE posts SET thumbnail_status = 'failed' WHERE id = ?", (post['id'],))
+            failed += 1
+        else:
+            updated = db.execute(
+                "UPDATE posts SET thumbnail_status = 'ready', thumbnail_width = ?, thumbnail_height = ? WHERE id = ?",
+                (width, height, post['id'])
+            ).rowcount
+            # The post may have been deleted while its images were being resized
+            if updated:
+                replaced = post_thumbnail_files(db, [post['id']])[1]
+                db.executemany('''
+                    INSERT OR REPLACE INTO post_thumbnails (post_id, variant, path, width, height, bytes)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [(post['id'], variant, *derivative) for variant, derivative in derivatives.items()])
+                restyled |= _store_thumbnail_colors(db, post, palette)
+                processed += 1
+        # Commit per image so the write lock is never held while resizing
+        db.commit()
+        if replaced:
+            # Regenerated derivatives get new names; the ones they replace are dropped
+            reclaim_thumbnail_files(db, set(), replaced)
+    
+    # Filled-in colour styles feed the thumbnail_color trends, so the project's data has changed
+    if restyled:
+        bump_data_version(db, [project_id])
+        db.commit()
+        schedule_project_refresh([project_id])
+    return {'processed': processed, 'failed': failed}
+
+def _model_job(db, project_id):
+    model = refit_prediction_model(db, project_id)
+    return model and {key: model[key] for key in ('n', 'iterations', 'intercept', 'sigma2', 'data_version')}
+
+# Background job types: name -> handler(db, project_id) returning a JSON-serializable result
+JOB_HANDLERS = {
+    'report': _report_job,
+    'trends': _trends_job,
+    'rollups': _rollups_job,
+    'hashtags': _hashtags_job,
+    'model': _model_job,
+    'thumbnails': _thumbnails_job,
+}
+
+_job_lock = threading.Lock()
+_job_workers = 0
+
+def enqueue_job(db, user_id, project_id, job_type):
+    """Record a queued job, reusing an identical one still waiting (the caller commits)"""
+    cutoff = datetime.fromtimestamp(time.time() - app.config['JOB_RETENTION_DAYS'] * 86400).isoformat()
+    db.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (cutoff,))
+    queued = db.execute(
+        "SELECT id FROM jobs WHERE project_id = ? AND job_type = ? AND status = 'queued'", (project_id, job_type)
+    ).fetchone()
+    if queued:
+        return queued['id']
+    cursor = db.execute('''
+        INSERT INTO jobs (user_id, project_id, job_type, status, created_at)
+        VALUES (?, ?, ?, 'queued', ?)
+    ''', (user_id, project_id, job_type, datetime.now().isoformat()))
+    return cursor.lastrowid
+
+def _claim_job(db):
+    db.execute('BEGIN IMMEDIATE')
+    # A job waits while another of its type runs for the same project; that worker picks it up next
+    job = db.execute('''
+        SELECT id, project_id, job_type FROM jobs j
+        WHERE status = 'queued' AND NOT EXISTS (
+            SELECT 1 FROM jobs r WHERE r.project_id = j.project_id AND r.job_type = j.job_type AND r.status = 'running'
+        )
+        ORDER BY id LIMIT 1
+    ''').fetchone()
+    if job is not None:
+        db.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (datetime.now().isoformat(), job['id']))
+    db.commit()
+    return job
+
+def _job_worker():
+    global _job_workers
+    counted = True
+    backoff = app.config['JOB_CLAIM_BACKOFF']
+    with app.app_context():
+        db = get_db_connection()
+        try:
+            while True:
+                try:
+                    with _job_lock:
+                        job = _claim_job(db)
+                        if job is None:
+                            # Leave the pool under the lock so start_job_workers never counts an exiting thread
+                            _job_workers -= 1
+                            counted = False
+                            return
+                except sqlite3.Error as e:
+                    db.rollback()
+                    print(f"Error claiming job, retrying in {backoff:g}s: {str(e)}")
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 30)
+                    continue
+                backoff = app.config['JOB_CLAIM_BACKOFF']
+                try:
+                    result = JOB_HANDLERS[job['job_type']](db, job['project_id'])
+                    body = zlib.compress(json.dumps(result, separators=(',', ':')).encode())
+                    db.execute(
+                        "UPDATE jobs SET status = 'done', result = ?, finished_at = ? WHERE id = ?",
+                        (body, datetime.now().isoformat(), job['id'])
+                    )
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    print(f"Error running {job['job_type']} job {job['id']}: {str(e)}")
+                    db.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                        (str(e), datetime.now().isoformat(), job['id'])
+                    )
+                    db.commit()
+        finally:
+            db.close()
+            if counted:
+                with _job_lock:
+                    _job_workers -= 1
+
+def start_job_workers():
+    """Top the worker pool up to JOB_WORKERS threads while jobs are queued"""
+    global _job_workers
+    with _job_lock:
+        while _job_workers < app.config['JOB_WORKERS']:
+            _job_workers += 1
+            threading.Thread(target=_job_worker, daemon=True).start()
+
+def recover_jobs(db):
+    """Requeue jobs that were running when the process stopped"""
+    db.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+    db.commit()
+
+# Uploaded thumbnails are kept as the original plus THUMBNAIL_VARIANTS derivatives, which the job
+# workers generate off-request; pages show a derivative once thumbnail_status is 'ready'.
+def generate_thumbnail_derivatives(filename):
+    """Write the THUMBNAIL_VARIANTS derivatives of an uploaded thumbnail and measure its palette.
+
+    Returns the original (width, height), {variant: (path, width, height, bytes)} with paths
+    relative to UPLOAD_FOLDER like thumbnail_path, and the palette of the smallest derivative.
+    Derivatives are content-addressed like uploads: each is named by the SHA-256 of its own bytes,
+    so regenerating one with other settings gives it a new name.
+    """
+    folder = app.config['UPLOAD_FOLDER']
+    image_format = app.config['THUMBNAIL_FORMAT']
+    # Largest first, so each smaller derivative is resized from the previous one
+    variants = sorted(app.config['THUMBNAIL_VARIANTS'].items(), key=lambda item: item[1], reverse=True)
+    
+    derivatives = {}
+    with Image.open(os.path.join(folder, filename)) as image:
+        width, height = image.size
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):  # EXIF orientation rotated by 90 degrees
+            width, height = height, width
+        # JPEG can decode at a reduced scale, which is far cheaper than decoding a full-size photo
+        image.draft('RGB', variants[0][1])
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        
+        for variant, box in variants:
+            image.thumbnail(box, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            encoded = io.BytesIO()
+            image.save(encoded, image_format, quality=app.config['THUMBNAIL_QUALITY'])
+            data = encoded.getvalue()
+            name = f'{hashlib.sha256(data).hexdigest()}.{image_format.lower()}'
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                # Already stored for another post: touch it so a concurrent reclaim treats it as new
+                os.utime(path)
+            else:
+                # Write beside the final name and rename, so readers never see a partial file
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(data)
+                os.replace(path + '.tmp', path)
+            derivatives[variant] = (name, image.width, image.height, len(data))
+        palette = extract_thumbnail_palette(image)
+    return (width, height), derivatives, palette
+
+# Thumbnail colour styles, matching the choices on the add-post form
+THUMBNAIL_COLOR_STYLES = ['Bright', 'Neutral', 'Dark', 'Colorful', 'Monochrome']
+
+def extract_thumbnail_palette(image):
+    """Dominant colours as [(hex, share)], most common first, from a k-means quantization of a 64px copy"""
+    sample = image.convert('RGB')
+    sample.thumbnail((64, 64))
+    quantized = sample.quantize(colors=app.config['THUMBNAIL_PALETTE_SIZE'], method=Image.Quantize.MEDIANCUT, kmeans=3)
+    palette = quantized.getpalette()
+    counts = sorted(quantized.getcolors(), reverse=True)
+    total = sum(count for count, _ in counts)
+    return [
+        ('#{:02x}{:02x}{:02x}'.format(*palette[index * 3:index * 3 + 3]), round(count / total, 3))
+        for count, index in counts
+    ]
+
+def thumbnail_color_style(palette):
+    """Classify a palette into one of THUMBNAIL_COLOR_STYLES from its share-weighted saturation and brightness"""
+    hsv = [
+        (colorsys.rgb_to_hsv(*(int(hex_color[i:i + 2], 16) / 255 for i in (1, 3, 5))), share)
+        for hex_color, share in palette
+    ]
+    saturation = sum(s * share for (_, s, _), share in hsv)
+    value = sum(v * share for (_, _, v), share in hsv)
+    # Hue families (sixths of the colour wheel) among clearly coloured, prominent palette entries
+    hues = {round(h * 6) % 6 for (h, s, v), share in hsv if s > 0.35 and v > 0.25 and share >= 0.1}
+    if value < 0.3:
+        return 'Dark'
+    if saturation < 0.12:
+        return 'Monochrome'
+    if len(hues) >= 3:
+        return 'Colorful'
+    if value >= 0.6 and saturation >= 0.3:
+        return 'Bright'
+    return 'Neutral'
+
+def thumbnail_file_palette(filename):
+    """Palette of a stored thumbnail or derivative"""
+    with Image.open(os.path.join(app.config['UPLOAD_FOLDER'], filename)) as image:
+        image.draft('RGB', (64, 64))
+        return extract_thumbnail_palette(image)
+
+def _store_thumbnail_colors(db, post, palette):
+    """Record a post's palette and fill in its colour style unless one was chosen; True if the style changed"""
+    style = thumbnail_color_style(palette) if palette else None
+    db.execute('''
+        UPDATE posts SET thumbnail_palette = ?, thumbnail_dominant_hex = ?,
+            dominant_color = CASE WHEN COALESCE(dominant_color, '') = '' THEN ? ELSE dominant_color END
+        WHERE id = ?
+    ''', (json.dumps(palette), palette[0][0] if palette else None, style, post['id']))
+    return bool(style) and not post['dominant_color']
+
+# Uploads are stored under the SHA-256 of their content, so an image uploaded for several posts is
+# kept once. Posts reference files by thumbnail_path (and their derivatives via post_thumbnails),
+# and a file is deleted once nothing references it.
+CONTENT_ADDRESSED_NAME = re.compile(r'^[0-9a-f]{64}\.\w+$')
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def _hash_stream(stream, out=None):
+    """SHA-256 hex digest of a binary stream read in chunks, copying it to `out` when given"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        if out is not None:
+            out.write(chunk)
+    return digest.hexdigest()
+
+def store_thumbnail_upload(file):
+    """Stream an uploaded image to disk while hashing it; returns its content-addressed name"""
+    folder = app.config['UPLOAD_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    # allowed_file() has checked the original name's extension; the stored name is the content hash
+    extension = file.filename.rsplit('.', 1)[1].lower().replace('jpeg', 'jpg')
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            name = f'{_hash_stream(file.stream, out)}.{extension}'
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            # Already stored: touch it so a concurrent reclaim treats it as new
+            os.utime(path)
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return name
+
+def post_thumbnail_files(db, post_ids):
+    """(originals, derivatives): the stored file paths of the given posts"""
+    originals, derivatives = set(), set()
+    post_ids = list(post_ids)
+    for start in range(0, len(post_ids), 500):
+        chunk = post_ids[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        originals.update(row[0] for row in db.execute(
+            f"SELECT DISTINCT thumbnail_path FROM posts WHERE id IN ({placeholders}) AND COALESCE(thumbnail_path, '') != ''", chunk
+        ))
+        derivatives.update(row[0] for row in db.execute(
+            f'SELECT DISTINCT path FROM post_thumbnails WHERE post_id IN ({placeholders})', chunk
+        ))
+    return originals, derivatives
+
+def reclaim_thumbnail_files(db, originals, derivatives):
+    """Delete the given files that no post references any more; returns how many were removed.
+
+    Files modified within THUMBNAIL_GC_GRACE_SECONDS are kept, since an identical upload or a
+    thumbnails job may be about to reference them; thumbnails-gc removes them later.
+    """
+    candidates = sorted(originals | derivatives)
+    cutoff = time.time() - app.config['THUMBNAIL_GC_GRACE_SECONDS']
+    removed = 0
+    for start in range(0, len(candidates), 500):
+        chunk = candidates[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        referenced = {row[0] for row in db.execute(f'''
+            SELECT thumbnail_path FROM posts WHERE thumbnail_path IN ({placeholders})
+            UNION SELECT path FROM post_thumbnails WHERE path IN ({placeholders})
+        ''', chunk + chunk)}
+        for path in chunk:
+            # Paths can come from imported rows, so only plain names inside the folder are touched
+            if path in referenced or os.path.basename(path) != path:
+                continue
+            full_path = os.path.join(app.config['UPLOAD_FOLDER'], path)
+            try:
+                if os.path.getmtime(full_path) <= cutoff:
+                    os.remove(full_path)
+                    removed += 1
+            except OSError:
+                pass  # Already gone or not removable; thumbnails-gc retries
+    return removed
+
+def thumbnail_variant_paths(db, post_ids, variant):
+    """{post_id: derivative path} for the posts that have the variant"""
+    if not post_ids:
+        return {}
+    return {
+        row['post_id']: row['path']
+        for row in db.execute(f'''
+            SELECT post_id, path FROM post_thumbnails
+            WHERE variant = ? AND post_id IN ({','.join('?' * len(post_ids))})
+        ''', [variant] + list(post_ids))
+    }
+
+EXPORT_BATCH_SIZE = 500
+
+class _CSVLine:
+    """File-like target that hands csv.writer output back instead of buffering it"""
+    def write(self, value):
+        return value
+
+# CSV header and posts column for every field export_csv() writes (and /import reads back)
+EXPORT_COLUMNS = [
+    ('Post Type', 'post_type'), ('Date', 'post_date'), ('Time', 'post_time'),
+    ('Caption', 'caption'), ('Category', 'caption_category'),
+    ('Likes', 'likes'), ('Comments', 'comments'), ('Shares', 'shares'), ('Saves', 'saves'),
+    ('Reach', 'reach'), ('Followers Gained', 'followers_gained'),
+    ('Reel Length (s)', 'reel_length'), ('Watch Time (s)', 'watch_time'),
+    ('Avg View Duration (s)', 'avg_view_duration'),
+    ('Engagement Rate (%)', 'engagement_rate'), ('Weighted Engagement (%)', 'engagement_rate_weighted'),
+    ('AVD Ratio (%)', 'avd_ratio'), ('Follower Gain Rate (%)', 'follower_gain_rate'),
+    ('Performance Score', 'performance_score'), ('Dominant Color', 'dominant_color')
+]
+
+POST_TYPES = {'Reel', 'Story', 'Carousel', 'Single'}
+IMPORT_CHUNK_SIZE = 500
+
+# Accept either the export headers or raw column names (used by JSON imports)
+IMPORT_FIELD_NAMES = {header.lower(): column for header, column in EXPORT_COLUMNS}
+IMPORT_FIELD_NAMES.update({column: column for _, column in EXPORT_COLUMNS})
+
+def _import_number(record, field, required=True, cast=int):
+    value = record.get(field)
+    if value is None or str(value).strip() == '':
+        if required:
+            raise ValueError(f'{field} is required')
+        return None
+    try:
+        number = cast(float(str(value).replace(',', '')))
+    except (ValueError, OverflowError):
+        raise ValueError(f'{field} must be a number, got {value!r}')
+    if number < 0:
+        raise ValueError(f'{field} cannot be negative')
+    return number
+
+def parse_import_record(raw):
+    """Validate one imported CSV/JSON record and return post column values"""
+    record = {}
+    for key, value in raw.items():
+        column = IMPORT_FIELD_NAMES.get(str(key).strip().lower()) if key is not None else None
+        if column:
+            record[column] = value.strip() if isinstance(value, str) else value
+    
+    post_type = record.get('post_type')
+    if post_type not in POST_TYPES:
+        raise ValueError(f'invalid post type {post_type!r}')
+    
+    try:
+        post_date = datetime.strptime(str(record.get('post_date') or ''), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"invalid date {record.get('post_date')!r}, expected YYYY-MM-DD")
+    try:
+        post_time = datetime.strptime(str(record.get('post_time') or '')[:5], '%H:%M').strftime('%H:%M')
+    except ValueError:
+        raise ValueError(f"invalid time {record.get('post_time')!r}, expected HH:MM")
+    
+    values = {
+        'post_type': post_type,
+        'post_date': post_date,
+        'post_time': post_time,
+        'caption': record.get('caption') or '',
+        'caption_category': record.get('caption_category') or '',
+        'dominant_color': record.get('dominant_color') or '',
+        'likes': _import_number(record, 'likes'),
+        'comments': _import_number(record, 'comments'),
+        'shares': _import_number(record, 'shares'),
+        'saves': _import_number(record, 'saves'),
+        'reach': _import_number(record, 'reach'),
+        'followers_gained': _import_number(record, 'followers_gained'),
+        'reel_length': _import_number(record, 'reel_length', required=False),
+        'watch_time': _import_number(record, 'watch_time', required=False),
+        'avg_view_duration': _import_number(record, 'avg_view_duration', required=False, cast=float)
+    }
+    
+    if not values['caption_category']:
+        raise ValueError('caption category is required')
+    return values
+
+def _insert_import_chunk(project_id, chunk, db):
+    """Insert validated records with one executemany per table and commit"""
+    metrics = calculate_metrics_batch(*(
+        [record[column] for record in chunk]
+        for column in ('likes', 'comments', 'shares', 'saves', 'reach',
+                       'avg_view_duration', 'reel_length', 'followers_gained')
+    ))
+    
+    posts = [
+        {**record, 'project_id': project_id, **{name: values[i] for name, values in metrics.items()}}
+        for i, record in enumerate(chunk)
+    ]
+    apply_post_baselines(db, posts)
+    db.executemany(POST_INSERT_SQL, [post_insert_values(post) for post in posts])
+    # The chunk is inserted inside one write transaction, so its AUTOINCREMENT ids are consecutive;
+    # read the last one before the rollup upserts change last_insert_rowid()
+    last_id = db.execute('SELECT last_insert_rowid()').fetchone()[0]
+    first_id = last_id - len(chunk) + 1
+    apply_post_rollups(db, posts)
+    bump_data_version(db, [project_id])
+    
+    save_post_hashtags(db, [(first_id + i, record['caption']) for i, record in enumerate(chunk)])
+    db.commit()
+
+def import_posts(records, project_id, db, chunk_size=IMPORT_CHUNK_SIZE):
+    """Import an iterable of raw records into a project, committing in chunks.
+
+    Invalid rows are skipped and reported; they never abort the import.
+    Returns a summary dict with the imported count and per-row errors.
+    """
+    imported = 0
+    errors = []
+    chunk = []
+    
+    for row_number, raw in enumerate(records, start=1):
+        try:
+            if not isinstance(raw, dict):
+                raise ValueError('record is not an object')
+            chunk.append(parse_import_record(raw))
+        except ValueError as e:
+            errors.append({'row': row_number, 'error': str(e)})
+            continue
+        
+        if len(chunk) >= chunk_size:
+            _insert_import_chunk(project_id, chunk, db)
+            imported += len(chunk)
+            chunk = []
+    
+    if chunk:
+        _insert_import_chunk(project_id, chunk, db)
+        imported += len(chunk)
+    
+    if imported:
+        schedule_project_refresh([project_id])
+    return {'imported': imported, 'errors': errors}
+
+def read_import_records(stream, filename):
+    """Yield raw records from an uploaded CSV (streamed) or JSON file"""
+    if filename.lower().endswith('.json'):
+        data = json.load(io.TextIOWrapper(stream, encoding='utf-8-sig'))
+        if isinstance(data, dict):
+            data = data.get('posts', [])
+        yield from data
+    else:
+        yield from csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+
+# Representative hot queries, used by the db-query-plans command
+HOT_QUERIES = [
+    ('dashboard stats',
+     'SELECT COUNT(*), AVG(engagement_rate), SUM(reach) FROM posts WHERE project_id IN (1, 2)', ()),
+    ('recent posts',
+     "SELECT id, performance_score FROM posts WHERE project_id IN (1, 2) AND post_date >= date('now', '-7 days') ORDER BY post_date DESC", ()),
+    ('type/category lookup',
+     "SELECT AVG(performance_score) FROM posts WHERE project_id = 1 AND post_type = 'Reel' AND caption_category = 'Educational'", ()),
+    ('posts at an hour',
+     'SELECT AVG(performance_score) FROM posts WHERE project_id = 1 AND post_hour = ?', (18,)),
+    ('posts per month',
+     'SELECT post_month, COUNT(*) FROM posts WHERE project_id = 1 GROUP BY post_month', ()),
+    ('hashtags by post',
+     'SELECT h.tag FROM post_hashtags ph JOIN hashtag h ON h.id = ph.hashtag_id WHERE ph.post_id = ?', (1,)),
+    ('posts by hashtag',
+     'SELECT ph.post_id FROM hashtag h JOIN post_hashtags ph ON ph.hashtag_id = h.id WHERE h.tag = ?', ('travel',)),
+    ('top hashtags by score', '''
+        SELECT ph.hashtag_id, COUNT(*), AVG(p.performance_score)
+        FROM post_hashtags ph JOIN posts p ON p.id = ph.post_id
+        WHERE p.project_id IN (1) GROUP BY ph.hashtag_id
+     ''', ()),
+    ('post comments',
+     'SELECT * FROM post_comments WHERE post_id = ? ORDER BY created_at DESC LIMIT 10', (1,)),
+    ('score by thumbnail colour style',
+     "SELECT dominant_color, AVG(performance_score), AVG(engagement_rate_weighted), COUNT(*) FROM posts WHERE project_id = 1 AND COALESCE(dominant_color, '') != '' GROUP BY dominant_color", ()),
+]
+
+def _time_query(db, query, params, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        db.execute(query, params).fetchall()
+    return (time.perf_counter() - start) / runs * 1000
+
+def benchmark_hot_queries(db, runs=20):
+    """Plan and mean milliseconds of each HOT_QUERIES entry, before and after the migration indexes.
+
+    'after' runs against the database as it is; 'before' against a temporary copy with every idx_*
+    index dropped, so both see the same data.
+    """
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    unindexed = sqlite3.connect(path)
+    try:
+        db.backup(unindexed)
+        for (name,) in unindexed.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx!_%' ESCAPE '!'").fetchall():
+            unindexed.execute(f'DROP INDEX {name}')
+        unindexed.commit()
+        
+        results = []
+        for name, query, params in HOT_QUERIES:
+            result = {'name': name}
+            for label, conn in (('before', unindexed), ('after', db)):
+                plan = ' / '.join(row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params))
+                result[label] = {'ms': _time_query(conn, query, params, runs), 'plan': plan}
+            results.append(result)
+        return results
+    finally:
+        unindexed.close()
+        os.remove(path)
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Create missing tables and apply pending schema migrations."""
+    init_db()
+    db = get_db_connection()
+    version = db.execute('SELECT MAX(version) FROM schema_version').fetchone()[0]
+    db.close()
+    click.echo(f'Database schema at version {version}')
+
+@app.cli.command('rollups-rebuild')
+@click.option('--project-id', type=int, default=None, help='Only rebuild this project')
+def rollups_rebuild_command(project_id):
+    """Recompute the post_rollups table from raw posts."""
+    db = get_db_connection()
+    rebuild_rollups(db, project_id)
+    db.commit()
+    db.close()
+    click.echo('Rollups rebuilt')
+
+@app.cli.command('rollups-check')
+def rollups_check_command():
+    """Verify post_rollups matches a fresh aggregation of posts."""
+    db = get_db_connection()
+    mismatches = check_rollups(db)
+    db.close()
+    for mismatch in mismatches:
+        click.echo(f"{mismatch['key']}: stored={mismatch['stored']} expected={mismatch['expected']}", err=True)
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} rollup rows are inconsistent; run rollups-rebuild')
+    click.echo('Rollups are consistent')
+
+@app.cli.command('trends-refresh')
+@click.option('--project-id', type=int, default=None, help='Only refresh this project')
+def trends_refresh_command(project_id):
+    """Materialize the trends table (suitable for a scheduled job)."""
+    db = get_db_connection()
+    if project_id is not None:
+        project_ids = [project_id]
+    else:
+        project_ids = [row['id'] for row in db.execute('SELECT id FROM projects').fetchall()]
+    for pid in project_ids:
+        materialize_trends(db, pid)
+        db.commit()
+    db.close()
+    click.echo(f'Refreshed trends for {len(project_ids)} projects')
+
+@app.cli.command('thumbnails-process')
+@click.option('--project-id', type=int, default=None, help='Only process this project')
+def thumbnails_process_command(project_id):
+    """Resize pending thumbnails and measure colours for existing ones."""
+    db = get_db_connection()
+    if project_id is not None:
+        project_ids = [project_id]
+    else:
+        project_ids = [row['id'] for row in db.execute('SELECT id FROM projects').fetchall()]
+    processed = failed = 0
+    for pid in project_ids:
+        result = _thumbnails_job(db, pid)
+        if 'error' in result:
+            db.close()
+            raise click.ClickException(result['error'])
+        processed += result['processed']
+        failed += result['failed']
+    db.close()
+    click.echo(f'Processed {processed} thumbnails ({failed} failed) in {len(project_ids)} projects')
+
+@app.cli.command('thumbnails-gc')
+@click.option('--dry-run', is_flag=True, help='Report what would change without touching files')
+def thumbnails_gc_command(dry_run):
+    """Move older uploads to content-addressed names and delete files no post references."""
+    db = get_db_connection()
+    folder = app.config['UPLOAD_FOLDER']
+    
+    # Uploads from before content addressing: identical images collapse onto one hashed file
+    moved = 0
+    changed_projects = set()
+    legacy = db.execute(
+        "SELECT DISTINCT thumbnail_path FROM posts WHERE COALESCE(thumbnail_path, '') != ''"
+    ).fetchall()
+    for (path,) in legacy:
+        full_path = os.path.join(folder, path)
+        if CONTENT_ADDRESSED_NAME.match(path) or os.path.basename(path) != path or not os.path.isfile(full_path):
+            continue
+        with open(full_path, 'rb') as f:
+            name = f"{_hash_stream(f)}.{path.rsplit('.', 1)[-1].lower().replace('jpeg', 'jpg')}"
+        moved += 1
+        if dry_run:
+            continue
+        if os.path.exists(os.path.join(folder, name)):
+            os.remove(full_path)
+        else:
+            os.replace(full_path, os.path.join(folder, name))
+        changed_projects.update(
+            row[0] for row in db.execute('SELECT DISTINCT project_id FROM posts WHERE thumbnail_path = ?', (path,))
+        )
+        db.execute('UPDATE posts SET thumbnail_path = ? WHERE thumbnail_path = ?', (name, path))
+        db.commit()
+    # Report snapshots hold thumbnail paths, so they are rebuilt on their next view
+    if changed_projects:
+        bump_data_version(db, changed_projects)
+        db.commit()
+    
+    referenced = {row[0] for row in db.execute('SELECT thumbnail_path FROM posts UNION SELECT path FROM post_thumbnails')}
+    db.close()
+    cutoff = time.time() - app.config['THUMBNAIL_GC_GRACE_SECONDS']
+    removed = reclaimed = 0
+    os.makedirs(folder, exist_ok=True)
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            # Leftover partial uploads end in .tmp and are never referenced
+            if not entry.is_file() or entry.name in referenced or entry.stat().st_mtime > cutoff:
+                continue
+            removed += 1
+            reclaimed += entry.stat().st_size
+            if not dry_run:
+                os.remove(entry.path)
+    click.echo(f"{'Would move' if dry_run else 'Moved'} {moved} uploads to content-addressed names and "
+               f"{'would remove' if dry_run else 'removed'} {removed} unreferenced files ({reclaimed} bytes)")
+
+@app.cli.command('db-query-plans')
+@click.option('--benchmark', is_flag=True, help='Also time each query with and without the migration indexes')
+@click.option('--runs', type=int, default=20, help='Timed runs per query when benchmarking')
+def db_query_plans_command(benchmark, runs):
+    """Print EXPLAIN QUERY PLAN output for the app's hot queries."""
+    db = get_db_connection()
+    if benchmark:
+        for result in benchmark_hot_queries(db, runs):
+            click.echo(f"-- {result['name']}")
+            for label in ('before', 'after'):
+                click.echo(f"   {label:<6} {result[label]['ms']:9.3f} ms  {result[label]['plan']}")
+        db.close()
+        return
+    for name, query, params in HOT_QUERIES:
+        click.echo(f'-- {name}')
+        for row in db.execute(f'EXPLAIN QUERY PLAN {query}', params):
+            click.echo(f"   {row['detail']}")
+    db.close()
+
 @app.route('/')
 def index():
     if 'user_id' not in session:
@@ -494,50 +3018,55 @@ def dashboard():
     # Get dashboard stats
     db = get_db_connection()
     
-    # Get user's project IDs
+    # Get user's project IDs and data versions
     projects = db.execute(
-        'SELECT id FROM projects WHERE user_id = ?', 
-        (session['user_id'],)
-    ).fetchall()
-    
-    stats = {
-        'total_posts': 0,
-        'avg_engagement': 0,
-        'total_reach': 0,
-        'new_followers': 0
-    }
-    
-    if projects:
-        project_ids = [str(p['id']) for p in projects]
-        project_ids_str = ','.join(project_ids)
-        
-        # Get post stats
-        post_stats = db.execute(f'''
-            SELECT 
-                COUNT(*) as total_posts,
-                AVG(engagement_rate) as avg_engagement,
-                SUM(reach) as total_reach,
-                SUM(followers_gained) as new_followers
-            FROM posts 
-            WHERE project_id IN ({project_ids_str})
-        ''').fetchone()
-        
-        if post_stats and post_stats['total_posts'] > 0:
-            stats = {
-                'total_posts': post_stats['total_posts'],
-                'avg_engagement': round(post_stats['avg_engagement'] or 0, 1),
-                'total_reach': int(post_stats['total_reach'] or 0),
-                'new_followers': int(post_stats['new_followers'] or 0)
-            }
+        'SELECT id, data_version FROM projects WHERE user_id = ?', 
+        (session['user_id'],)
+    ).fetchall()
     
-    # Get quick recommendations and alerts for dashboard
+    stats = {
+        'total_posts': 0,
+        'avg_engagement': 0,
+        'total_reach': 0,
+        'new_followers': 0
+    }
     quick_recommendations = []
     alerts = []
+    
     if projects:
         project_ids = [str(p['id']) for p in projects]
         project_ids_str = ','.join(project_ids)
-        quick_recommendations = generate_smart_recommendations(project_ids_str, db)[:2]  # Top 2 recommendations
-        alerts = check_performance_alerts(project_ids_str, db)[:3]  # Top 3 alerts
+        
+        # Any post write bumps a project's data_version, which changes the key.
+        # The UTC day is included because recommendations and alerts use date('now').
+        cache_key = (
+            session['user_id'],
+            tuple((p['id'], p['data_version']) for p in projects),
+            datetime.utcnow().date().isoformat()
+        )
+        
+        cached = dashboard_cache.get(('summary',) + cache_key)
+        if cached is None:
+            # Get post stats from the project rollups
+            post_stats = read_rollups(db, project_ids_str, 'total').get('')
+            
+            if post_stats and post_stats['post_count'] > 0:
+                stats = {
+                    'total_posts': post_stats['post_count'],
+                    'avg_engagement': round(post_stats['engagement_sum'] / post_stats['post_count'], 1),
+                    'total_reach': int(post_stats['reach_sum'] or 0),
+                    'new_followers': int(post_stats['followers_sum'] or 0)
+                }
+            
+            quick_recommendations = generate_smart_recommendations(project_ids_str, db)[:2]  # Top 2 recommendations
+            dashboard_cache.set(('summary',) + cache_key, (stats, quick_recommendations))
+        else:
+            stats, quick_recommendations = cached
+        
+        alerts = dashboard_cache.get(('alerts',) + cache_key)
+        if alerts is None:
+            alerts = check_performance_alerts(project_ids_str, db)[:3]  # Top 3 alerts
+            dashboard_cache.set(('alerts',) + cache_key, alerts, ttl=app.config['ALERTS_CACHE_TTL'])
     
     db.close()
     
@@ -588,15 +3117,8 @@ def add_post():
                     # In cloud environment, just store the filename without actually saving
                     # This prevents filesystem errors on read-only systems like Railway
                     try:
-                        filename = secure_filename(file.filename)
-                        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                        filename = timestamp + filename
-                        
-                        # Try to create upload directory if it doesn't exist
-                        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-                        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                        file.save(file_path)
-                        thumbnail_path = filename
+                        # Stored by content hash, so re-uploading an image reuses the existing file
+                        thumbnail_path = store_thumbnail_upload(file)
                     except (OSError, PermissionError):
                         # If file saving fails (read-only filesystem), continue without thumbnail
                         thumbnail_path = None
@@ -646,23 +3168,20 @@ def add_post():
             )
             
             # Insert post
-            cursor = db.execute('''
-                INSERT INTO posts (
-                    project_id, post_type, post_date, post_time, reel_length,
-                    thumbnail_path, caption, caption_category, likes, shares,
-                    comments, reach, saves, followers_gained, watch_time,
-                    avg_view_duration, engagement_rate, engagement_rate_weighted,
-                    avd_ratio, follower_gain_rate, performance_score, dominant_color
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                project_id, post_type, post_date, post_time, reel_length,
-                thumbnail_path, caption, caption_category, likes, shares,
-                comments, reach, saves, followers_gained, watch_time,
-                avg_view_duration, metrics['engagement_rate'], 
-                metrics['engagement_rate_weighted'], metrics['avd_ratio'],
-                metrics['follower_gain_rate'], metrics['performance_score'], 
-                dominant_color
-            ))
+            post = {
+                'project_id': project_id, 'post_type': post_type, 'post_date': post_date,
+                'post_time': post_time, 'reel_length': reel_length, 'thumbnail_path': thumbnail_path,
+                'caption': caption, 'caption_category': caption_category, 'likes': likes,
+                'shares': shares, 'comments': comments, 'reach': reach, 'saves': saves,
+                'followers_gained': followers_gained, 'watch_time': watch_time,
+                'avg_view_duration': avg_view_duration, 'dominant_color': dominant_color,
+                'thumbnail_status': 'pending' if thumbnail_path and Image is not None else None,
+                **metrics
+            }
+            apply_post_baselines(db, [post])
+            cursor = db.execute(POST_INSERT_SQL, post_insert_values(post))
+            apply_post_rollups(db, [post])
+            bump_data_version(db, [project_id])
             
             # Get the ID of the newly inserted post
             post_id = cursor.lastrowid
@@ -670,8 +3189,15 @@ def add_post():
             # Extract and save hashtags
             save_hashtags(post_id, caption, db)
             
+            # Resized derivatives are generated by the job workers after the response
+            if post['thumbnail_status'] == 'pending':
+                enqueue_job(db, session['user_id'], project_id, 'thumbnails')
+            
             db.commit()
             db.close()
+            schedule_project_refresh([project_id])
+            if post['thumbnail_status'] == 'pending':
+                start_job_workers()
             
             flash('Post added successfully!')
             return redirect(url_for('posts'))
@@ -693,43 +3219,67 @@ def posts():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    # Get sorting parameter
-    sort_by = request.args.get('sort', 'post_date')
-    order = request.args.get('order', 'desc')
-    
-    # Validate sort parameters
-    valid_sorts = ['post_date', 'engagement_rate', 'performance_score', 'reach', 'likes']
-    if sort_by not in valid_sorts:
-        sort_by = 'post_date'
-    
-    if order not in ['asc', 'desc']:
-        order = 'desc'
+    sort_by, order, after, limit = post_list_args(request.args)
+    cursor = decode_post_cursor(after) if after else None
     
     # Get user's posts
     db = get_db_connection()
     
     # First get user's project IDs
     projects = db.execute(
-        'SELECT id FROM projects WHERE user_id = ?', 
+        'SELECT id FROM projects WHERE user_id = ?',
         (session['user_id'],)
     ).fetchall()
     
+    project_ids_str = ','.join(str(p['id']) for p in projects)
+    posts_data, next_cursor = [], None
     if projects:
-        project_ids = [str(p['id']) for p in projects]
-        project_ids_str = ','.join(project_ids)
-        
-        query = f'''
-            SELECT * FROM posts 
-            WHERE project_id IN ({project_ids_str})
-            ORDER BY {sort_by} {order.upper()}
-        '''
-        posts_data = db.execute(query).fetchall()
-    else:
-        posts_data = []
+        posts_data, next_cursor = fetch_post_page(db, project_ids_str, sort_by, order, cursor, limit)
+    totals = post_totals(db, project_ids_str)
+    
+    db.close()
+    
+    return render_template(
+        'posts.html', posts=posts_data, sort_by=sort_by, order=order,
+        after=after if cursor else None, next_cursor=next_cursor, totals=totals
+    )
+
+@app.route('/api/posts')
+def api_posts():
+    """One keyset page of posts as JSON, for infinite scroll"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    sort_by, order, after, limit = post_list_args(request.args)
+    cursor = decode_post_cursor(after) if after else None
+    if after and cursor is None:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    db = get_db_connection()
+    project_filter, params = ('', [session['user_id']])
+    if request.args.get('project', type=int) is not None:
+        project_filter, params = ('AND id = ?', params + [request.args.get('project', type=int)])
+    projects = db.execute(f'SELECT id FROM projects WHERE user_id = ? {project_filter}', params).fetchall()
+    
+    posts_data, next_cursor = [], None
+    if projects:
+        project_ids_str = ','.join(str(p['id']) for p in projects)
+        posts_data, next_cursor = fetch_post_page(
+            db, project_ids_str, sort_by, order, cursor, limit, request.args.get('hashtag')
+        )
     
     db.close()
     
-    return render_template('posts.html', posts=posts_data, sort_by=sort_by, order=order)
+    return jsonify({
+        'posts': [dict(post) for post in posts_data],
+        'sort': sort_by,
+        'order': order,
+        'next_cursor': next_cursor,
+        'next_url': url_for(
+            'api_posts', sort=sort_by, order=order, limit=limit, after=next_cursor,
+            project=request.args.get('project', type=int), hashtag=request.args.get('hashtag')
+        ) if next_cursor else None
+    })
 
 @app.route('/reports')
 def reports():
@@ -763,18 +3313,20 @@ def reports():
             project_ids = [str(p['id']) for p in projects]
             project_ids_str = ','.join(project_ids)
             
-            # Get all posts for this user to calculate metrics
-            all_posts = db.execute('''
-                SELECT * FROM posts p
-                JOIN projects pr ON p.project_id = pr.id
-                WHERE pr.user_id = ?
-                ORDER BY post_date DESC
-            ''', (session['user_id'],)).fetchall()
+            # Stream the user's posts straight into the analytics engine
+            all_posts = db.execute(f'''
+                SELECT {ANALYTICS_COLUMNS}
+                FROM posts p
+                WHERE p.project_id IN ({project_ids_str})
+            ''')
             
-            # Use calculate_metrics function for safety
-            if all_posts:
-                metrics = calculate_metrics(all_posts)
+            # Trends come from the daily rollups; velocity is measured against their smoothed baseline
+            series = build_time_series(db, project_ids_str)
+            metrics = build_analytics(all_posts, engagement_baseline=engagement_baseline(series))
+            if metrics:
                 analytics_data.update(metrics)
+                analytics_data.update(report_trends(series))
+                analytics_data['recommendations'] = generate_smart_recommendations(project_ids_str, db)
     
         db.close()
         
@@ -797,77 +3349,105 @@ def reports():
         })
 
 # API endpoints for chart data
-@app.route('/api/engagement-data')
-def api_engagement_data():
+@app.route('/api/chart-series')
+def api_chart_series():
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     
+    # Optional: ?metrics=engagement,reach&frequency=day|week|month&start=YYYY-MM-DD&end=YYYY-MM-DD&project=<id>&points=<n>
+    metrics = [metric for metric in request.args.get('metrics', 'engagement,reach').split(',') if metric]
+    frequency = request.args.get('frequency', 'day')
+    start_date = request.args.get('start', '')
+    end_date = request.args.get('end', '')
+    project_filter = request.args.get('project', type=int)
+    points = request.args.get('points', 500, type=int)
+    
+    unknown = [metric for metric in metrics if metric not in CHART_METRICS]
+    if not metrics or unknown:
+        return jsonify({'error': f"metrics must be a comma-separated list of {', '.join(CHART_METRICS)}"}), 400
+    if frequency not in SERIES_FREQUENCIES:
+        return jsonify({'error': f"frequency must be one of {', '.join(SERIES_FREQUENCIES)}"}), 400
+    for value in (start_date, end_date):
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return jsonify({'error': 'Invalid date range'}), 400
+    
     db = get_db_connection()
     projects = db.execute(
-        'SELECT id FROM projects WHERE user_id = ?', 
+        'SELECT id FROM projects WHERE user_id = ?',
         (session['user_id'],)
     ).fetchall()
-    
+    if project_filter is not None:
+        projects = [p for p in projects if p['id'] == project_filter]
     if not projects:
-        return jsonify({'dates': [], 'engagement': []})
-    
-    project_ids = [str(p['id']) for p in projects]
-    project_ids_str = ','.join(project_ids)
-    
-    data = db.execute(f'''
-        SELECT post_date, AVG(engagement_rate) as avg_engagement
-        FROM posts 
-        WHERE project_id IN ({project_ids_str})
-        GROUP BY post_date
-        ORDER BY post_date
-        LIMIT 30
-    ''').fetchall()
+        db.close()
+        return jsonify({'error': 'No projects found'}), 404
+    project_ids_str = ','.join(str(p['id']) for p in projects)
     
+    # All metrics come from one read of the daily rollups
+    result = chart_series(
+        db, project_ids_str, metrics, frequency, start_date, end_date, min(max(points, 3), CHART_MAX_POINTS)
+    )
     db.close()
     
-    return jsonify({
-        'dates': [row['post_date'] for row in data],
-        'engagement': [round(row['avg_engagement'], 2) for row in data]
-    })
+    return jsonify(result)
 
-@app.route('/api/reach-data')
-def api_reach_data():
-    if 'user_id' not in session:
-        return jsonify({'error': 'Unauthorized'}), 401
-    
+def _recent_daily_metric(metric):
+    """Dates and values of one chart metric for the user's latest 30 posting days"""
     db = get_db_connection()
     projects = db.execute(
         'SELECT id FROM projects WHERE user_id = ?', 
         (session['user_id'],)
     ).fetchall()
+    series = chart_series(db, ','.join(str(p['id']) for p in projects), ['count', metric]) if projects else None
+    db.close()
+    if series is None:
+        return [], []
     
-    if not projects:
-        return jsonify({'dates': [], 'reach': []})
-    
-    project_ids = [str(p['id']) for p in projects]
-    project_ids_str = ','.join(project_ids)
-    
-    data = db.execute(f'''
-        SELECT post_date, SUM(reach) as total_reach
-        FROM posts 
-        WHERE project_id IN ({project_ids_str})
-        GROUP BY post_date
-        ORDER BY post_date
-        LIMIT 30
-    ''').fetchall()
+    days = [
+        (start, value)
+        for start, count, value in zip(series['starts'], series['series']['count'], series['series'][metric])
+        if count
+    ][-30:]
+    return [start for start, _ in days], [value for _, value in days]
+
+@app.route('/api/engagement-data')
+def api_engagement_data():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
     
-    db.close()
+    dates, engagement = _recent_daily_metric('engagement_rate')
+    return jsonify({'dates': dates, 'engagement': engagement})
+
+@app.route('/api/reach-data')
+def api_reach_data():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
     
-    return jsonify({
-        'dates': [row['post_date'] for row in data],
-        'reach': [row['total_reach'] for row in data]
-    })
+    dates, reach = _recent_daily_metric('reach')
+    return jsonify({'dates': dates, 'reach': reach})
 
 @app.route('/export/csv')
 def export_csv():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
+    # Optional filters: ?project=<id>&start=YYYY-MM-DD&end=YYYY-MM-DD&full_captions=1
+    project_filter = request.args.get('project', type=int)
+    start_date = request.args.get('start', '')
+    end_date = request.args.get('end', '')
+    full_captions = request.args.get('full_captions') == '1'
+    
+    for value in (start_date, end_date):
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                flash('Invalid export date range')
+                return redirect(url_for('posts'))
+    
     # Get user's posts
     db = get_db_connection()
     projects = db.execute(
@@ -875,14 +3455,26 @@ def export_csv():
         (session['user_id'],)
     ).fetchall()
     
-    if not projects:
+    project_ids = [p['id'] for p in projects]
+    if project_filter is not None:
+        project_ids = [pid for pid in project_ids if pid == project_filter]
+    
+    if not project_ids:
+        db.close()
         flash('No posts to export')
         return redirect(url_for('posts'))
     
-    project_ids = [str(p['id']) for p in projects]
-    project_ids_str = ','.join(project_ids)
+    project_ids_str = ','.join(str(pid) for pid in project_ids)
+    conditions = [f'project_id IN ({project_ids_str})']
+    params = []
+    if start_date:
+        conditions.append('post_date >= ?')
+        params.append(start_date)
+    if end_date:
+        conditions.append('post_date <= ?')
+        params.append(end_date)
     
-    posts_data = db.execute(f'''
+    cursor = db.execute(f'''
         SELECT 
             post_type, post_date, post_time, caption, caption_category,
             likes, comments, shares, saves, reach, followers_gained,
@@ -890,45 +3482,90 @@ def export_csv():
             engagement_rate, engagement_rate_weighted, avd_ratio,
             follower_gain_rate, performance_score, dominant_color
         FROM posts 
-        WHERE project_id IN ({project_ids_str})
+        WHERE {' AND '.join(conditions)}
         ORDER BY post_date DESC
-    ''').fetchall()
-    
-    db.close()
+    ''', params)
     
-    # Create CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'Post Type', 'Date', 'Time', 'Caption', 'Category',
-        'Likes', 'Comments', 'Shares', 'Saves', 'Reach', 'Followers Gained',
-        'Reel Length (s)', 'Watch Time (s)', 'Avg View Duration (s)',
-        'Engagement Rate (%)', 'Weighted Engagement (%)', 'AVD Ratio (%)',
-        'Follower Gain Rate (%)', 'Performance Score', 'Dominant Color'
-    ])
-    
-    # Write data
-    for post in posts_data:
-        writer.writerow([
-            post['post_type'], post['post_date'], post['post_time'],
-            post['caption'][:100] + '...' if post['caption'] and len(post['caption']) > 100 else post['caption'],
-            post['caption_category'], post['likes'], post['comments'],
-            post['shares'], post['saves'], post['reach'], post['followers_gained'],
-            post['reel_length'] or '', post['watch_time'] or '', post['avg_view_duration'] or '',
-            post['engagement_rate'], post['engagement_rate_weighted'], post['avd_ratio'],
-            post['follower_gain_rate'], post['performance_score'], post['dominant_color']
-        ])
+    def generate():
+        # csv.writer hands each formatted line to write(), which just returns it
+        writer = csv.writer(_CSVLine())
+        try:
+            yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+            while True:
+                batch = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not batch:
+                    break
+                yield ''.join(writer.writerow([
+                    post['post_type'], post['post_date'], post['post_time'],
+                    post['caption'][:100] + '...' if not full_captions and post['caption'] and len(post['caption']) > 100 else post['caption'],
+                    post['caption_category'], post['likes'], post['comments'],
+                    post['shares'], post['saves'], post['reach'], post['followers_gained'],
+                    post['reel_length'] or '', post['watch_time'] or '', post['avg_view_duration'] or '',
+                    post['engagement_rate'], post['engagement_rate_weighted'], post['avd_ratio'],
+                    post['follower_gain_rate'], post['performance_score'], post['dominant_color']
+                ]) for post in batch)
+        finally:
+            db.close()
     
-    # Create response
-    output.seek(0)
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
+    # Stream rows straight from the cursor instead of building the file in memory
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
     response.headers['Content-Disposition'] = f'attachment; filename=instagram_posts_{session["username"]}_{datetime.now().strftime("%Y%m%d")}.csv'
     
     return response
 
+@app.route('/import', methods=['GET', 'POST'])
+def import_data():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    db = get_db_connection()
+    user_projects = db.execute(
+        'SELECT id, project_name FROM projects WHERE user_id = ? ORDER BY project_name',
+        (session['user_id'],)
+    ).fetchall()
+    
+    result = None
+    if request.method == 'POST':
+        project = db.execute(
+            'SELECT id FROM projects WHERE id = ? AND user_id = ?',
+            (request.form.get('project_id'), session['user_id'])
+        ).fetchone()
+        file = request.files.get('file')
+        
+        if not project:
+            flash('Invalid project selected')
+        elif not file or file.filename == '':
+            flash('Please choose a CSV or JSON file to import')
+        else:
+            try:
+                result = import_posts(read_import_records(file.stream, file.filename), project['id'], db)
+                flash(f"Imported {result['imported']} posts ({len(result['errors'])} rows skipped)")
+            except (UnicodeDecodeError, ValueError, csv.Error) as e:
+                db.rollback()
+                flash(f'Error reading import file: {str(e)}', 'error')
+    
+    db.close()
+    
+    return render_template('import_posts.html', projects=user_projects, result=result)
+
+@app.cli.command('import-posts')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--project-id', type=int, required=True, help='Project to import the posts into')
+def import_posts_command(path, project_id):
+    """Import posts from a CSV or JSON file in the export_csv() layout."""
+    db = get_db_connection()
+    if not db.execute('SELECT id FROM projects WHERE id = ?', (project_id,)).fetchone():
+        db.close()
+        raise click.ClickException(f'Project {project_id} does not exist')
+    
+    with open(path, 'rb') as stream:
+        result = import_posts(read_import_records(stream, path), project_id, db)
+    db.close()
+    
+    for error in result['errors']:
+        click.echo(f"Row {error['row']}: {error['error']}", err=True)
+    click.echo(f"Imported {result['imported']} posts, skipped {len(result['errors'])} rows")
+
 # Project Management Routes
 @app.route('/projects')
 def projects():
@@ -1002,15 +3639,18 @@ def project_posts(project_id):
         flash('Project not found')
         return redirect(url_for('projects'))
     
-    # Get posts for this project
-    posts_data = db.execute(
-        'SELECT * FROM posts WHERE project_id = ? ORDER BY post_date DESC',
-        (project_id,)
-    ).fetchall()
+    # Get one page of posts for this project
+    sort_by, order, after, limit = post_list_args(request.args)
+    cursor = decode_post_cursor(after) if after else None
+    posts_data, next_cursor = fetch_post_page(db, str(project_id), sort_by, order, cursor, limit)
+    totals = post_totals(db, str(project_id))
     
     db.close()
     
-    return render_template('project_posts.html', project=project, posts=posts_data)
+    return render_template(
+        'project_posts.html', project=project, posts=posts_data, sort_by=sort_by, order=order,
+        after=after if cursor else None, next_cursor=next_cursor, totals=totals
+    )
 
 # Comments System Routes
 @app.route('/posts/<int:post_id>/comments', methods=['GET', 'POST'])
@@ -1022,7 +3662,8 @@ def post_comments(post_id):
     
     # Verify post exists and user has access (through their projects)
     post = db.execute('''
-        SELECT p.*, pr.project_name 
+        SELECT p.*, pr.project_name,
+            (SELECT path FROM post_thumbnails t WHERE t.post_id = p.id AND t.variant = 'list') as thumbnail_list_path
         FROM posts p 
         JOIN projects pr ON p.project_id = pr.id 
         WHERE p.id = ? AND (pr.user_id = ? OR pr.id IN (
@@ -1084,33 +3725,381 @@ def api_post_comments(post_id):
         'created_at': comment['created_at']
     } for comment in comments])
 
+@app.route('/thumbnails/<filename>')
+def thumbnail(filename):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Served only when one of the user's posts references the file, as an original or a derivative
+    db = get_db_connection()
+    owned = db.execute('''
+        SELECT 1 FROM posts p JOIN projects pr ON p.project_id = pr.id
+        WHERE p.thumbnail_path = ? AND pr.user_id = ?
+        UNION ALL
+        SELECT 1 FROM post_thumbnails t JOIN posts p ON t.post_id = p.id JOIN projects pr ON p.project_id = pr.id
+        WHERE t.path = ? AND pr.user_id = ?
+        LIMIT 1
+    ''', (filename, session['user_id'], filename, session['user_id'])).fetchone()
+    db.close()
+    if not owned:
+        return jsonify({'error': 'Thumbnail not found'}), 404
+    
+    # Uploads and derivatives are named by the SHA-256 of their bytes, which is a strong ETag as is,
+    # and their URL changes whenever the content does, so they can be cached indefinitely. Files from
+    # before content addressing get Werkzeug's mtime/size tag and are revalidated on every use.
+    # send_file answers If-None-Match with 304 and Range with 206, and streams through the server's
+    # wsgi.file_wrapper (sendfile) or X-Sendfile when USE_X_SENDFILE is set.
+    content_addressed = CONTENT_ADDRESSED_NAME.match(filename) is not None
+    response = send_from_directory(
+        os.path.abspath(app.config['UPLOAD_FOLDER']), filename,
+        etag=filename.split('.', 1)[0] if content_addressed else True,
+        max_age=app.config['THUMBNAIL_MAX_AGE'] if content_addressed else 0
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if content_addressed:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+@app.route('/api/db-stats')
+def api_db_stats():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    with _db_pool_lock:
+        stats = dict(DB_POOL_STATS)
+        stats['idle'] = sum(len(idle) for idle in _db_pool.values())
+    
+    return jsonify(stats)
+
+@app.route('/api/cache-stats')
+def api_cache_stats():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify({'dashboard': dashboard_cache.snapshot(), 'hashtags': hashtag_cache.snapshot()})
+
+def _job_json(job):
+    return {
+        'id': job['id'],
+        'type': job['job_type'],
+        'project_id': job['project_id'],
+        'status': job['status'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'status_url': url_for('api_job_status', job_id=job['id']),
+        'result_url': url_for('api_job_result', job_id=job['id'])
+    }
+
+@app.route('/api/projects/<int:project_id>/jobs', methods=['POST'])
+def api_enqueue_job(project_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    job_type = request.values.get('type', 'report')
+    if job_type not in JOB_HANDLERS:
+        return jsonify({'error': f"Unknown job type '{job_type}'", 'types': sorted(JOB_HANDLERS)}), 400
+    
+    db = get_db_connection()
+    project = db.execute(
+        'SELECT id FROM projects WHERE id = ? AND user_id = ?', (project_id, session['user_id'])
+    ).fetchone()
+    if not project:
+        db.close()
+        return jsonify({'error': 'Project not found'}), 404
+    
+    job_id = enqueue_job(db, session['user_id'], project_id, job_type)
+    db.commit()
+    job = db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    db.close()
+    start_job_workers()
+    
+    response = jsonify(_job_json(job))
+    response.headers['Location'] = url_for('api_job_status', job_id=job_id)
+    return response, 202
+
+@app.route('/api/jobs/<int:job_id>')
+def api_job_status(job_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    db = get_db_connection()
+    job = db.execute('SELECT * FROM jobs WHERE id = ? AND user_id = ?', (job_id, session['user_id'])).fetchone()
+    db.close()
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # Jobs queued before a restart are picked up by the next poll
+    if job['status'] == 'queued':
+        start_job_workers()
+    return jsonify(_job_json(job))
+
+@app.route('/api/jobs/<int:job_id>/result')
+def api_job_result(job_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    db = get_db_connection()
+    job = db.execute('SELECT * FROM jobs WHERE id = ? AND user_id = ?', (job_id, session['user_id'])).fetchone()
+    db.close()
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] == 'failed':
+        return jsonify({'error': job['error'], 'status': job['status']}), 500
+    if job['status'] != 'done':
+        return jsonify({'error': 'Job has not finished', 'status': job['status']}), 409
+    
+    return Response(zlib.decompress(job['result']), mimetype='application/json')
+
+@app.route('/api/hashtag-analytics')
+def api_hashtag_analytics():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Optional filters: ?project=<id>&start=YYYY-MM-DD&end=YYYY-MM-DD&min_posts=<n>&limit=<n>
+    project_filter = request.args.get('project', type=int)
+    start_date = request.args.get('start', '')
+    end_date = request.args.get('end', '')
+    min_posts = max(request.args.get('min_posts', 1, type=int), 1)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    
+    for value in (start_date, end_date):
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return jsonify({'error': 'Invalid date range'}), 400
+    
+    db = get_db_connection()
+    projects = db.execute(
+        'SELECT id, data_version FROM projects WHERE user_id = ?',
+        (session['user_id'],)
+    ).fetchall()
+    if project_filter is not None:
+        projects = [p for p in projects if p['id'] == project_filter]
+    if not projects:
+        db.close()
+        return jsonify({'error': 'No projects found'}), 404
+    
+    # Any post write bumps a project's data_version, which changes the key
+    cache_key = (
+        tuple((p['id'], p['data_version']) for p in projects),
+        start_date, end_date, min_posts, limit
+    )
+    result = hashtag_cache.get(cache_key)
+    if result is None:
+        project_ids_str = ','.join(str(p['id']) for p in projects)
+        result = hashtag_analytics(db, project_ids_str, start_date, end_date, min_posts, limit)
+        hashtag_cache.set(cache_key, result)
+    
+    db.close()
+    
+    return jsonify(result)
+
+@app.route('/api/anomalies')
+def api_anomalies():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Optional filters: ?project=<id>&days=<n>&threshold=<z>&limit=<n>; threshold=0 lists every scored post
+    project_filter = request.args.get('project', type=int)
+    days = min(max(request.args.get('days', 7, type=int), 1), 366)
+    threshold = max(request.args.get('threshold', app.config['ANOMALY_Z_THRESHOLD'], type=float), 0)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+    
+    db = get_db_connection()
+    projects = db.execute(
+        'SELECT id FROM projects WHERE user_id = ?',
+        (session['user_id'],)
+    ).fetchall()
+    if project_filter is not None:
+        projects = [p for p in projects if p['id'] == project_filter]
+    if not projects:
+        db.close()
+        return jsonify({'error': 'No projects found'}), 404
+    project_ids_str = ','.join(str(p['id']) for p in projects)
+    
+    baselines = db.execute(f'''
+        SELECT * FROM anomaly_baselines
+        WHERE project_id IN ({project_ids_str}) AND post_count > 0
+        ORDER BY project_id, post_type
+    ''').fetchall()
+    posts = db.execute(f'''
+        SELECT id, project_id, post_type, post_date, performance_score, engagement_rate_weighted,
+            anomaly_score_z, anomaly_engagement_z, anomaly_score_baseline
+        FROM posts
+        WHERE project_id IN ({project_ids_str})
+        AND post_date >= date('now', ?)
+        AND (ABS(anomaly_score_z) >= ? OR ABS(anomaly_engagement_z) >= ?)
+        ORDER BY post_date DESC, id DESC
+        LIMIT ?
+    ''', (f'-{days} days', threshold, threshold, limit)).fetchall()
+    db.close()
+    
+    return jsonify({
+        'threshold': threshold,
+        'days': days,
+        'baselines': [{
+            'project_id': b['project_id'],
+            'post_type': b['post_type'],
+            'posts': b['post_count'],
+            'scoring': b['post_count'] >= app.config['ANOMALY_WARMUP'],
+            'score_mean': round(b['score_mean'], 2),
+            'score_std': round(math.sqrt(b['score_var']), 2),
+            'engagement_mean': round(b['engagement_mean'], 2),
+            'engagement_std': round(math.sqrt(b['engagement_var']), 2)
+        } for b in baselines],
+        'posts': [{
+            'id': post['id'],
+            'project_id': post['project_id'],
+            'post_type': post['post_type'],
+            'post_date': post['post_date'],
+            'performance_score': post['performance_score'],
+            'engagement_rate_weighted': post['engagement_rate_weighted'],
+            'score_z': post['anomaly_score_z'],
+            'engagement_z': post['anomaly_engagement_z'],
+            'score_baseline': round(post['anomaly_score_baseline'], 2) if post['anomaly_score_baseline'] is not None else None
+        } for post in posts]
+    })
+
 @app.route('/api/predict-performance')
 def api_predict_performance():
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    # Get prediction parameters
+    # Get prediction parameters; weekday (Mon=0), caption, reel_length and project are optional
     post_type = request.args.get('type', 'Reel')
-    post_hour = int(request.args.get('hour', 12))
+    post_hour = request.args.get('hour', 12, type=int)
     caption_category = request.args.get('category', 'Educational')
+    weekday = request.args.get('weekday', type=int)
+    caption = request.args.get('caption')
+    reel_length = request.args.get('reel_length', type=float)
+    project_filter = request.args.get('project', type=int)
     
     db = get_db_connection()
     projects = db.execute(
         'SELECT id FROM projects WHERE user_id = ?', 
         (session['user_id'],)
     ).fetchall()
+    if project_filter is not None:
+        projects = [p for p in projects if p['id'] == project_filter]
     
     if not projects:
+        db.close()
         return jsonify({'error': 'No projects found'}), 404
     
     project_ids = [str(p['id']) for p in projects]
     project_ids_str = ','.join(project_ids)
     
-    prediction = predict_post_performance(post_type, post_hour, caption_category, project_ids_str, db)
+    prediction = predict_post_performance(
+        post_type, post_hour, caption_category, project_ids_str, db,
+        weekday=weekday, caption=caption, reel_length=reel_length
+    )
     db.close()
     
     return jsonify(prediction)
 
+def _prediction_candidate(raw):
+    """Validate one batch prediction candidate, raising ValueError with a readable message"""
+    if not isinstance(raw, dict):
+        raise ValueError('each candidate must be an object')
+    candidate = {'type': raw.get('type'), 'hour': raw.get('hour'), 'category': raw.get('category')}
+    if candidate['type'] not in POST_TYPES:
+        raise ValueError(f"type must be one of {', '.join(sorted(POST_TYPES))}")
+    # bool is a subclass of int, so true/false would otherwise pass as hour 1/0
+    if isinstance(candidate['hour'], bool) or not isinstance(candidate['hour'], int) or not 0 <= candidate['hour'] <= 23:
+        raise ValueError('hour must be an integer from 0 to 23')
+    if not candidate['category'] or not isinstance(candidate['category'], str):
+        raise ValueError('category is required')
+    if raw.get('weekday') is not None:
+        if isinstance(raw['weekday'], bool) or not isinstance(raw['weekday'], int) or not 0 <= raw['weekday'] <= 6:
+            raise ValueError('weekday must be an integer from 0 (Monday) to 6')
+        candidate['weekday'] = raw['weekday']
+    if raw.get('caption') is not None:
+        candidate['caption'] = str(raw['caption'])
+    if raw.get('reel_length') is not None:
+        candidate['reel_length'] = float(raw['reel_length'])
+    return candidate
+
+@app.route('/api/predict-performance/batch', methods=['POST'])
+def api_predict_performance_batch():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Body: {"candidates": [{type, hour, weekday, category, caption, reel_length}, ...]} or
+    # {"grid": {"types": [...], "hours": [...], "weekdays": [...], "categories": [...]}}, plus "project" and "top"
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    
+    db = get_db_connection()
+    projects = db.execute(
+        'SELECT id FROM projects WHERE user_id = ?',
+        (session['user_id'],)
+    ).fetchall()
+    if payload.get('project') is not None:
+        projects = [p for p in projects if p['id'] == payload.get('project')]
+    if not projects:
+        db.close()
+        return jsonify({'error': 'No projects found'}), 404
+    project_ids_str = ','.join(str(p['id']) for p in projects)
+    
+    raw_candidates = payload.get('candidates')
+    if raw_candidates is None:
+        grid = payload.get('grid') or {}
+        categories = grid.get('categories')
+        if not categories:
+            # Default to every category the models have seen
+            categories = sorted({
+                level for model in load_prediction_models(db, project_ids_str) if model
+                for level in model['factors']['category']
+            }) or ['Educational']
+        axes = [grid.get('types') or sorted(POST_TYPES), grid.get('hours') or list(range(24)),
+                grid.get('weekdays') or list(range(7)), categories]
+        if not all(isinstance(axis, list) for axis in axes):
+            db.close()
+            return jsonify({'error': 'grid values must be lists'}), 400
+        if math.prod(len(axis) for axis in axes) > app.config['PREDICTION_BATCH_MAX']:
+            db.close()
+            return jsonify({'error': f"At most {app.config['PREDICTION_BATCH_MAX']} candidates per request"}), 400
+        raw_candidates = [
+            {'type': post_type, 'hour': hour, 'weekday': weekday, 'category': category}
+            for post_type, hour, weekday, category in itertools.product(*axes)
+        ]
+    if not isinstance(raw_candidates, list) or not raw_candidates:
+        db.close()
+        return jsonify({'error': 'candidates must be a non-empty list'}), 400
+    if len(raw_candidates) > app.config['PREDICTION_BATCH_MAX']:
+        db.close()
+        return jsonify({'error': f"At most {app.config['PREDICTION_BATCH_MAX']} candidates per request"}), 400
+    
+    try:
+        candidates = [_prediction_candidate(raw) for raw in raw_candidates]
+    except (ValueError, TypeError) as e:
+        db.close()
+        return jsonify({'error': f'Invalid candidate: {str(e)}'}), 400
+    top = payload.get('top', 10)
+    if not isinstance(top, int) or top < 1:
+        db.close()
+        return jsonify({'error': 'top must be a positive integer'}), 400
+    
+    predictions = predict_candidates(candidates, project_ids_str, db)
+    db.close()
+    
+    best_slots = heapq.nlargest(
+        top, predictions,
+        key=lambda prediction: (prediction['predicted_score'], prediction['confidence'], prediction['predicted_engagement'])
+    )
+    return jsonify({
+        'count': len(predictions),
+        'best_slots': best_slots,
+        'predictions': predictions if payload.get('include_predictions', True) else []
+    })
+
 # Delete Routes
 @app.route('/posts/<int:post_id>/delete', methods=['POST'])
 def delete_post(post_id):
@@ -1132,17 +4121,26 @@ def delete_post(post_id):
         return jsonify({'success': False, 'error': 'Post not found or unauthorized'}), 404
     
     try:
+        thumbnail_files = post_thumbnail_files(db, [post_id])
+        
         # Delete related comments first
         db.execute('DELETE FROM post_comments WHERE post_id = ?', (post_id,))
         
         # Delete hashtags related to this post
-        db.execute('DELETE FROM hashtags WHERE post_id = ?', (post_id,))
+        db.execute('DELETE FROM post_hashtags WHERE post_id = ?', (post_id,))
+        db.execute('DELETE FROM post_thumbnails WHERE post_id = ?', (post_id,))
+        
+        remove_posts_from_rollups(db, [post_id])
+        invalidate_anomaly_baselines(db, [post_id])
+        bump_data_version(db, [post['project_id']])
         
         # Delete the post
         db.execute('DELETE FROM posts WHERE id = ?', (post_id,))
         
         db.commit()
+        reclaim_thumbnail_files(db, *thumbnail_files)
         db.close()
+        schedule_project_refresh([post['project_id']])
         
         return jsonify({'success': True})
     except Exception as e:
@@ -1167,7 +4165,7 @@ def delete_multiple_posts():
         # Verify user owns all these posts
         placeholders = ','.join('?' * len(post_ids))
         owned_posts = db.execute(f'''
-            SELECT p.id 
+            SELECT p.id, p.project_id 
             FROM posts p 
             JOIN projects pr ON p.project_id = pr.id 
             WHERE p.id IN ({placeholders}) AND pr.user_id = ?
@@ -1179,14 +4177,22 @@ def delete_multiple_posts():
             db.close()
             return jsonify({'success': False, 'error': 'Some posts not found or unauthorized'}), 404
         
+        thumbnail_files = post_thumbnail_files(db, owned_post_ids)
+        remove_posts_from_rollups(db, owned_post_ids)
+        invalidate_anomaly_baselines(db, owned_post_ids)
+        bump_data_version(db, [post['project_id'] for post in owned_posts])
+        
         # Delete related data for all posts
         for post_id in owned_post_ids:
             db.execute('DELETE FROM post_comments WHERE post_id = ?', (post_id,))
-            db.execute('DELETE FROM hashtags WHERE post_id = ?', (post_id,))
+            db.execute('DELETE FROM post_hashtags WHERE post_id = ?', (post_id,))
+            db.execute('DELETE FROM post_thumbnails WHERE post_id = ?', (post_id,))
             db.execute('DELETE FROM posts WHERE id = ?', (post_id,))
         
         db.commit()
+        reclaim_thumbnail_files(db, *thumbnail_files)
         db.close()
+        schedule_project_refresh(post['project_id'] for post in owned_posts)
         
         return jsonify({'success': True, 'deleted_count': len(owned_post_ids)})
     except Exception as e:
@@ -1214,20 +4220,30 @@ def delete_project(project_id):
     try:
         # Get all posts in this project
         posts = db.execute('SELECT id FROM posts WHERE project_id = ?', (project_id,)).fetchall()
+        thumbnail_files = post_thumbnail_files(db, [post['id'] for post in posts])
         
         # Delete all related data
         for post in posts:
             post_id = post['id']
             db.execute('DELETE FROM post_comments WHERE post_id = ?', (post_id,))
-            db.execute('DELETE FROM hashtags WHERE post_id = ?', (post_id,))
+            db.execute('DELETE FROM post_hashtags WHERE post_id = ?', (post_id,))
+            db.execute('DELETE FROM post_thumbnails WHERE post_id = ?', (post_id,))
         
         # Delete all posts in the project
         db.execute('DELETE FROM posts WHERE project_id = ?', (project_id,))
+        db.execute('DELETE FROM post_rollups WHERE project_id = ?', (project_id,))
+        db.execute('DELETE FROM trends WHERE project_id = ?', (project_id,))
+        db.execute('DELETE FROM reports WHERE project_id = ?', (project_id,))
+        db.execute('DELETE FROM jobs WHERE project_id = ?', (project_id,))
+        db.execute('DELETE FROM prediction_models WHERE project_id = ?', (project_id,))
+        db.execute('DELETE FROM anomaly_baselines WHERE project_id = ?', (project_id,))
+        _prediction_models.pop(project_id, None)
         
         # Delete the project
         db.execute('DELETE FROM projects WHERE id = ?', (project_id,))
         
         db.commit()
+        reclaim_thumbnail_files(db, *thumbnail_files)
         db.close()
         
         return jsonify({'success': True})
@@ -1254,36 +4270,34 @@ def generate_project_report(project_id):
         flash('Project not found')
         return redirect(url_for('projects'))
     
-    # Get project posts
-    posts = db.execute(
-        'SELECT * FROM posts WHERE project_id = ? ORDER BY post_date DESC',
-        (project_id,)
-    ).fetchall()
-    
-    if not posts:
-        flash('No posts in this project to generate report')
-        return redirect(url_for('project_posts', project_id=project_id))
-    
-    # Calculate metrics for the project
-    metrics = calculate_metrics(posts)
-    analytics = {
-        'engagement_over_time': metrics.get('engagement_over_time', []),
-        'reach_over_time': metrics.get('reach_over_time', []),
-        'performance_distribution': metrics.get('performance_distribution', []),
-        'posting_time_analysis': metrics.get('posting_time_analysis', []),
-        'caption_category_performance': metrics.get('caption_category_performance', []),
-        'hashtag_performance': metrics.get('hashtag_performance', []),
-        'content_insights': metrics.get('content_insights', []),
-        'day_of_week_analysis': metrics.get('day_of_week_analysis', []),
-        'monthly_trends': metrics.get('monthly_trends', []),
-        'growth_trends': metrics.get('growth_trends', {}),
-        'engagement_velocity': metrics.get('engagement_velocity', []),
-        'recommendations': generate_smart_recommendations(posts)
-    }
+    # Serve the stored snapshot; a stale one is shown while the worker rebuilds it
+    report = load_report_snapshot(db, project_id)
+    stale = False
+    if report is None:
+        totals = read_rollups(db, str(project_id), 'total').get('')
+        if not totals or not totals['post_count']:
+            db.close()
+            flash('No posts in this project to generate report')
+            return redirect(url_for('project_posts', project_id=project_id))
+        
+        # First report for this project: build it off-request and poll until it is ready
+        job_id = enqueue_job(db, session['user_id'], project_id, 'report')
+        db.commit()
+        db.close()
+        start_job_workers()
+        return render_template('report_pending.html', project=project, job_id=job_id)
+    elif report['data_version'] != project['data_version']:
+        schedule_project_refresh([project_id])
+        stale = True
     
+    # Derivatives can finish after the snapshot was built, so they are looked up at render time
+    thumbnails = thumbnail_variant_paths(db, [post['id'] for post in report['summary']['top_posts']], 'report')
     db.close()
     
-    return render_template('project_report.html', project=project, posts=posts, analytics=analytics)
+    return render_template(
+        'project_report.html', project=project, analytics=report['analytics'], summary=report['summary'],
+        report_date=report['report_date'], stale=stale, thumbnails=thumbnails
+    )
 
 if __name__ == '__main__':
     # Try to ensure upload directory exists (skip if read-only filesystem)
@@ -1295,6 +4309,13 @@ if __name__ == '__main__':
     # Initialize database
     init_db()
     
+    # Resume background jobs interrupted by the last shutdown
+    with app.app_context():
+        db = get_db_connection()
+        recover_jobs(db)
+        db.close()
+    start_job_workers()
+    
     # Create default users if they don't exist
     db = get_db_connection()
     
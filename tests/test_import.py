@@ -0,0 +1,41 @@
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'DATABASE', str(tmp_path / 'test.db'))
+    app_module.init_db()
+    with app_module.app.app_context():
+        conn = app_module.get_db_connection()
+        conn.execute("INSERT INTO users (username, password_hash) VALUES ('u', 'x')")
+        conn.execute("INSERT INTO projects (user_id, project_name) VALUES (1, 'p')")
+        conn.commit()
+        yield conn
+
+
+def _record(i):
+    return {
+        'post_type': 'Reel', 'post_date': f'2026-0{i % 9 + 1}-{i % 28 + 1:02d}', 'post_time': '18:00',
+        'caption': f'post {i} #tag{i}', 'caption_category': 'Educational',
+        'likes': i, 'comments': 1, 'shares': 1, 'saves': 1, 'reach': 100, 'followers_gained': 0,
+    }
+
+
+def test_imported_hashtags_link_to_their_own_posts(db):
+    # A deleted tail leaves AUTOINCREMENT ahead of MAX(id), and later chunks upsert existing rollups
+    app_module.import_posts([_record(i) for i in range(5)], 1, db)
+    db.execute('DELETE FROM post_hashtags WHERE post_id > 3')
+    db.execute('DELETE FROM posts WHERE id > 3')
+    db.commit()
+    summary = app_module.import_posts([_record(i) for i in range(5, 25)], 1, db, chunk_size=7)
+    assert summary['imported'] == 20
+    rows = db.execute('''
+        SELECT p.caption, h.tag FROM posts p
+        JOIN post_hashtags ph ON ph.post_id = p.id
+        JOIN hashtag h ON h.id = ph.hashtag_id
+    ''').fetchall()
+    assert len(rows) == 23
+    for row in rows:
+        assert row['caption'].endswith('#' + row['tag'])
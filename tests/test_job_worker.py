@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'DATABASE', str(tmp_path / 'test.db'))
+    monkeypatch.setitem(app_module.app.config, 'JOB_CLAIM_BACKOFF', 0)
+    monkeypatch.setattr(app_module, '_job_workers', 1)
+    app_module.init_db()
+    return app_module._job_worker
+
+
+def test_claim_errors_are_retried(worker, monkeypatch):
+    outcomes = [sqlite3.OperationalError('database is locked'), None]
+
+    def claim(db):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(app_module, '_claim_job', claim)
+    worker()
+    assert outcomes == []
+    assert app_module._job_workers == 0
+
+
+def test_worker_leaves_pool_when_it_dies(worker, monkeypatch):
+    def handler(db, project_id):
+        db.close = lambda: None
+        db.execute = None  # the 'failed' update raises too
+        raise RuntimeError('boom')
+
+    monkeypatch.setitem(app_module.JOB_HANDLERS, 'boom', handler)
+    monkeypatch.setattr(app_module, '_claim_job', lambda db: {'id': 1, 'project_id': 1, 'job_type': 'boom'})
+    with pytest.raises(TypeError):
+        worker()
+    assert app_module._job_workers == 0
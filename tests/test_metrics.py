@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from app import calculate_metrics, calculate_metrics_batch
+
+METRIC_ARGS = ('likes', 'comments', 'shares', 'saves', 'reach', 'avg_view_duration', 'reel_length', 'followers_gained')
+
+
+def random_row(rng):
+    """One post's calculate_metrics arguments, biased toward the zero and missing edge cases"""
+    reel_length = rng.choice([None, 0, rng.randint(1, 180)])
+    return {
+        'likes': rng.randint(0, 50000),
+        'comments': rng.randint(0, 5000),
+        'shares': rng.randint(0, 5000),
+        'saves': rng.randint(0, 5000),
+        'reach': rng.choice([0, 0, rng.randint(1, 10), rng.randint(1, 1000000)]),
+        'avg_view_duration': rng.choice([None, 0, round(rng.uniform(0, 200), 1)]) if reel_length is not None else None,
+        'reel_length': reel_length,
+        'followers_gained': rng.randint(0, 2000),
+    }
+
+
+def columns(rows):
+    return [[row[arg] for row in rows] for arg in METRIC_ARGS]
+
+
+def scalar_results(rows):
+    return [calculate_metrics(*(row[arg] for arg in METRIC_ARGS)) for row in rows]
+
+
+def batch_results(rows):
+    batch = calculate_metrics_batch(*columns(rows))
+    return [{name: values[i] for name, values in batch.items()} for i in range(len(rows))]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_batch_matches_scalar_on_random_rows(seed):
+    rows = [random_row(random.Random(seed * 1000 + i)) for i in range(500)]
+    assert batch_results(rows) == scalar_results(rows)
+
+
+@pytest.mark.parametrize('overrides', [
+    {'reach': 0},
+    {'reach': 0, 'likes': 0, 'comments': 0, 'shares': 0, 'saves': 0, 'followers_gained': 0},
+    {'reel_length': None, 'avg_view_duration': None},
+    {'reel_length': 0, 'avg_view_duration': 12.5},
+    {'reel_length': 30, 'avg_view_duration': None},
+    {'reel_length': 30, 'avg_view_duration': 45.0},
+])
+def test_batch_matches_scalar_on_edge_cases(overrides):
+    row = {'likes': 120, 'comments': 8, 'shares': 5, 'saves': 11, 'reach': 2400,
+           'avg_view_duration': 14.2, 'reel_length': 30, 'followers_gained': 3, **overrides}
+    assert batch_results([row]) == scalar_results([row])
+
+
+def test_batch_of_no_rows_is_empty():
+    assert calculate_metrics_batch(*([] for _ in METRIC_ARGS)) == {
+        'engagement_rate': [], 'engagement_rate_weighted': [], 'avd_ratio': [],
+        'follower_gain_rate': [], 'performance_score': []
+    }
@@ -0,0 +1,26 @@
+import pytest
+
+import app as app_module
+
+
+def _candidate(**overrides):
+    return {'type': 'Reel', 'hour': 18, 'category': 'Educational', **overrides}
+
+
+def test_valid_candidate_is_accepted():
+    assert app_module._prediction_candidate(_candidate(weekday=0)) == {
+        'type': 'Reel', 'hour': 18, 'category': 'Educational', 'weekday': 0
+    }
+
+
+@pytest.mark.parametrize('overrides, message', [
+    ({'hour': True}, 'hour'),
+    ({'hour': False}, 'hour'),
+    ({'hour': 24}, 'hour'),
+    ({'hour': '18'}, 'hour'),
+    ({'weekday': True}, 'weekday'),
+    ({'weekday': 7}, 'weekday'),
+])
+def test_invalid_hour_or_weekday_is_rejected(overrides, message):
+    with pytest.raises(ValueError, match=message):
+        app_module._prediction_candidate(_candidate(**overrides))
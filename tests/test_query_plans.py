@@ -0,0 +1,46 @@
+import pytest
+
+import app as app_module
+
+# Hot queries and the migration index each one should be answered from
+EXPECTED_INDEXES = {
+    'recent posts': 'idx_posts_project_date',
+    'type/category lookup': 'idx_posts_project_type_category',
+    'posts at an hour': 'idx_posts_project_hour',
+    'posts per month': 'idx_posts_project_month',
+    'posts by hashtag': 'idx_post_hashtags_hashtag',
+    'post comments': 'idx_post_comments_post_created',
+    'score by thumbnail colour style': 'idx_posts_project_color',
+}
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'DATABASE', str(tmp_path / 'test.db'))
+    app_module.init_db()
+    with app_module.app.app_context():
+        conn = app_module.get_db_connection()
+        conn.execute("INSERT INTO users (username, password_hash) VALUES ('u', 'x')")
+        conn.execute("INSERT INTO projects (user_id, project_name) VALUES (1, 'p')")
+        conn.executemany(
+            "INSERT INTO posts (project_id, post_type, post_date, post_time, post_hour, post_month, caption_category) "
+            "VALUES (1, 'Reel', ?, '18:00', 18, ?, 'Educational')",
+            [(f'2026-0{month}-10', f'2026-0{month}') for month in range(1, 10)]
+        )
+        conn.commit()
+        yield conn
+
+
+def test_benchmark_reports_plans_before_and_after_indexes(db):
+    results = {result['name']: result for result in app_module.benchmark_hot_queries(db, runs=1)}
+    assert set(results) == {name for name, _, _ in app_module.HOT_QUERIES}
+    for name, index in EXPECTED_INDEXES.items():
+        assert index in results[name]['after']['plan'], name
+        assert index not in results[name]['before']['plan'], name
+        assert results[name]['before']['ms'] >= 0 and results[name]['after']['ms'] >= 0
+
+
+def test_benchmark_leaves_the_database_indexed(db):
+    app_module.benchmark_hot_queries(db, runs=1)
+    indexes = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert set(EXPECTED_INDEXES.values()) <= indexes
@@ -0,0 +1,37 @@
+import pytest
+from flask.sessions import SecureCookieSessionInterface
+
+import app as app_module
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'DATABASE', str(tmp_path / 'test.db'))
+    # Cookie sessions keep the test from writing files into flask_session/
+    monkeypatch.setattr(app_module.app, 'session_interface', SecureCookieSessionInterface())
+    app_module.init_db()
+    with app_module.app.app_context():
+        db = app_module.get_db_connection()
+        db.execute("INSERT INTO users (username, password_hash) VALUES ('u', 'x')")
+        db.execute("INSERT INTO projects (user_id, project_name) VALUES (1, 'p')")
+        db.commit()
+        app_module.import_posts([
+            {'post_type': 'Reel', 'post_date': f'2026-03-{day:02d}', 'post_time': '18:00',
+             'caption': 'post', 'caption_category': 'Educational', 'likes': day, 'comments': 1,
+             'shares': 1, 'saves': 1, 'reach': 100, 'followers_gained': 0}
+            for day in range(1, 20)
+        ], 1, db)
+        db.close()
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    return client
+
+
+def test_single_month_report_has_no_growth_summary(client):
+    response = client.get('/reports')
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert 'Monthly Growth Trends' in page
+    assert 'Stable Performance' not in page
+    assert 'Score: %' not in page
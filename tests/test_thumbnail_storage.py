@@ -0,0 +1,74 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+import app as app_module
+
+
+@pytest.fixture
+def upload_folder(tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize('filename, extension', [
+    ('photo.png', 'png'),
+    ('..png', 'png'),
+    ('../../evil.JPEG', 'jpg'),
+    ('holiday.jpeg', 'jpg'),
+])
+def test_upload_is_named_by_content_hash(upload_folder, filename, extension):
+    data = b'not really an image ' + filename.encode()
+    assert app_module.allowed_file(filename)
+    name = app_module.store_thumbnail_upload(FileStorage(io.BytesIO(data), filename))
+    assert name == f'{hashlib.sha256(data).hexdigest()}.{extension}'
+    assert (upload_folder / name).read_bytes() == data
+
+
+def test_identical_uploads_share_one_file(upload_folder):
+    first = app_module.store_thumbnail_upload(FileStorage(io.BytesIO(b'same bytes'), 'a.png'))
+    second = app_module.store_thumbnail_upload(FileStorage(io.BytesIO(b'same bytes'), 'b.png'))
+    assert first == second
+    assert [path.name for path in upload_folder.iterdir()] == [first]
+
+
+@pytest.fixture
+def db(upload_folder, tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'DATABASE', str(tmp_path / 'test.db'))
+    app_module.init_db()
+    with app_module.app.app_context():
+        conn = app_module.get_db_connection()
+        yield conn
+        conn.close()
+
+
+def _age(path, seconds):
+    old = path.stat().st_mtime - seconds
+    os.utime(path, (old, old))
+
+
+def test_reclaim_keeps_recently_touched_derivatives(upload_folder, db):
+    grace = app_module.app.config['THUMBNAIL_GC_GRACE_SECONDS']
+    fresh, stale = upload_folder / 'fresh.webp', upload_folder / 'stale.webp'
+    fresh.write_bytes(b'fresh')
+    stale.write_bytes(b'stale')
+    _age(stale, grace + 60)
+    assert app_module.reclaim_thumbnail_files(db, set(), {'fresh.webp', 'stale.webp'}) == 1
+    assert fresh.exists() and not stale.exists()
+
+
+def test_reused_derivative_is_touched(upload_folder):
+    image = io.BytesIO()
+    Image.new('RGB', (600, 400), (200, 40, 40)).save(image, 'PNG')
+    name = app_module.store_thumbnail_upload(FileStorage(io.BytesIO(image.getvalue()), 'red.png'))
+    _, derivatives, _ = app_module.generate_thumbnail_derivatives(name)
+    paths = [upload_folder / path for path, *_ in derivatives.values()]
+    for path in paths:
+        _age(path, 7200)
+    app_module.generate_thumbnail_derivatives(name)
+    assert all(time.time() - path.stat().st_mtime < 60 for path in paths)